@@ -0,0 +1,374 @@
+"""
+Sincronização de comunidades inteiras com um índice local dos VODs já baixados.
+
+A listagem de mídia da comunidade é percorrida com a sessão autenticada (página a página,
+pelos endpoints configurados) e comparada com um índice SQLite de IDs, títulos, durações,
+qualidade escolhida e hash dos arquivos. Só os itens novos ou alterados vão para a fila de
+trabalhos, e o índice é atualizado numa transação quando cada download termina. Assim, uma
+sincronização noturna custa uma leitura da listagem e nenhum download repetido.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit, quote
+
+from network import HttpPool, HttpError
+import jobs
+
+# Endpoints de API da listagem de mídia de uma comunidade, consultados página a página.
+# '{community}' é o nome da comunidade na URL (ex: 'bts') e '{after}' o cursor da próxima página
+# (vazio na primeira). Sem endpoints, só os VODs presentes na página da comunidade são listados.
+LISTING_ENDPOINTS = []
+MAX_LISTING_PAGES = 500 # Limite de páginas por sincronização (protege contra cursores que nunca terminam)
+HASH_CHUNK = 1024 * 1024
+
+# Estados no índice
+QUEUED = 'queued'
+DOWNLOADED = 'downloaded'
+
+_MEDIA_LINK_RE = re.compile(r'/([A-Za-z0-9_.-]+)/(?:media|live)/(\d+-\d+)')
+_MEDIA_ID_RE = re.compile(r'^\d+-\d+$')
+_ID_KEYS = ('postId', 'post_id', 'mediaId', 'id')
+_TITLE_KEYS = ('title', 'name')
+_DURATION_KEYS = ('playTime', 'duration', 'durationSec', 'playtime')
+_CURSOR_KEYS = ('after', 'nextCursor', 'next_cursor', 'cursor')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    media_id TEXT PRIMARY KEY,
+    community TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    duration REAL,
+    variant TEXT,
+    state TEXT NOT NULL,
+    job_id INTEGER,
+    output_file TEXT,
+    file_size INTEGER,
+    file_hash TEXT,
+    listed_at REAL NOT NULL,
+    downloaded_at REAL
+);
+CREATE INDEX IF NOT EXISTS media_community ON media (community);
+CREATE INDEX IF NOT EXISTS media_job ON media (job_id);
+"""
+
+
+@dataclass
+class ListedMedia:
+    """One VOD of a community listing."""
+    media_id: str
+    url: str
+    title: str = ''
+    duration: Optional[float] = None
+
+
+def community_from_url(url):
+    """The community name of a Weverse URL (first path segment, e.g. 'bts' for https://weverse.io/bts/media)."""
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+    if not segments:
+        raise ValueError(f"URL sem comunidade: {url}")
+    return segments[0]
+
+
+def media_url(community, media_id):
+    return f"https://weverse.io/{community}/media/{media_id}"
+
+
+def variant_key(policy):
+    """Compact description of a VariantPolicy for the index (e.g. 'best', 'best<=720p', 'worst')."""
+    if policy is None:
+        return 'best'
+    key = policy.quality
+    if policy.max_height:
+        key += f"<={policy.max_height}p"
+    if policy.max_bandwidth:
+        key += f"<={policy.max_bandwidth}bps"
+    if policy.min_height:
+        key += f">={policy.min_height}p"
+    return key
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _first_value(item, keys):
+    for key in keys:
+        if item.get(key) not in (None, ''):
+            return item[key]
+    return None
+
+
+def _find_duration(item):
+    """Looks for a duration field in the item or in nested objects (e.g. extension.video.playTime)."""
+    value = _first_value(item, _DURATION_KEYS)
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit()):
+        return float(value)
+    for child in item.values():
+        if isinstance(child, dict):
+            found = _find_duration(child)
+            if found is not None:
+                return found
+    return None
+
+
+def _find_cursor(data):
+    """The next-page cursor of a listing response (e.g. paging.nextParams.after), or None on the last page."""
+    if isinstance(data, dict):
+        for key in _CURSOR_KEYS:
+            if isinstance(data.get(key), (str, int)) and data[key] != '':
+                return str(data[key])
+        for child in data.values():
+            found = _find_cursor(child)
+            if found:
+                return found
+    return None
+
+
+def _collect_items(data, community, found):
+    if isinstance(data, dict):
+        media_id = _first_value(data, _ID_KEYS)
+        if isinstance(media_id, str) and _MEDIA_ID_RE.match(media_id):
+            title = _first_value(data, _TITLE_KEYS)
+            found.append(ListedMedia(media_id, media_url(community, media_id),
+                                     title if isinstance(title, str) else '', _find_duration(data)))
+            return
+        for child in data.values():
+            _collect_items(child, community, found)
+    elif isinstance(data, list):
+        for child in data:
+            _collect_items(child, community, found)
+
+
+def parse_listing(text, community):
+    """
+    Extracts the VODs of one listing response: (items, next_cursor).
+    JSON bodies are walked for objects with a post ID ('1-123...'), title and duration;
+    HTML pages only yield the media links (without title or duration, and without a cursor).
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if data is not None:
+        items = []
+        _collect_items(data, community, items)
+        return items, _find_cursor(data)
+    items = []
+    for link_community, media_id in _MEDIA_LINK_RE.findall(text):
+        if link_community == community:
+            items.append(ListedMedia(media_id, media_url(community, media_id)))
+    return items, None
+
+
+def list_community(community_url, cookies, pool=None, endpoints=None, status_callback=print):
+    """
+    Lists every VOD of a community with the authenticated session (Selenium-style `cookies`).
+    Items are returned in listing order without duplicates. Raises HttpError/OSError if nothing could be read.
+    """
+    community = community_from_url(community_url)
+    parts = urlsplit(community_url)
+    own_pool = pool is None
+    pool = pool or HttpPool(cookies=cookies, headers={'Accept': 'application/json,text/html;q=0.9,*/*;q=0.8'})
+    listed = {}
+    page_error = None
+    try:
+        try:
+            page_html, _ = pool.get_text(f"{parts.scheme}://{parts.netloc}/{community}/media")
+            for item in parse_listing(page_html, community)[0]:
+                listed.setdefault(item.media_id, item)
+        except (HttpError, OSError) as e:
+            print(f"Listagem: falha ao baixar a página da comunidade ({e}).")
+            page_error = e
+
+        for template in (LISTING_ENDPOINTS if endpoints is None else endpoints):
+            cursor, seen_cursors = '', set()
+            for page in range(MAX_LISTING_PAGES):
+                try:
+                    body, _ = pool.get_text(template.format(community=community, after=quote(cursor)),
+                                            headers={'Referer': community_url})
+                except (HttpError, OSError) as e:
+                    print(f"Listagem: falha no endpoint {template} ({e}).")
+                    break
+                items, cursor = parse_listing(body, community)
+                for item in items:
+                    # A API traz título e duração; substitui o que veio só do HTML
+                    if item.media_id not in listed or not listed[item.media_id].title:
+                        listed[item.media_id] = item
+                status_callback(f"Listando {community}: página {page + 1}, {len(listed)} VOD(s)...")
+                if not items or not cursor or cursor in seen_cursors:
+                    break
+                seen_cursors.add(cursor)
+    finally:
+        if own_pool:
+            pool.close()
+    if page_error and not listed:
+        raise page_error
+    return list(listed.values())
+
+
+class ArchiveIndex:
+    """SQLite index of the VODs seen in community listings and of the files downloaded for them. Thread-safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, media_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM media WHERE media_id = ?', (media_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, community=None):
+        with self._lock:
+            if community:
+                rows = self._conn.execute('SELECT * FROM media WHERE community = ? ORDER BY media_id',
+                                          (community,)).fetchall()
+            else:
+                rows = self._conn.execute('SELECT * FROM media ORDER BY media_id').fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_queued(self, community, entries, variant):
+        """Records (ListedMedia, job_id) pairs as queued, all in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for item, job_id in entries:
+                    self._conn.execute(
+                        'INSERT INTO media (media_id, community, url, title, duration, variant, state, job_id, listed_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                        'ON CONFLICT(media_id) DO UPDATE SET url = excluded.url, title = excluded.title, '
+                        'duration = excluded.duration, variant = excluded.variant, state = excluded.state, '
+                        'job_id = excluded.job_id, listed_at = excluded.listed_at',
+                        (item.media_id, community, item.url, item.title, item.duration, variant, QUEUED, job_id, now),
+                    )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def touch(self, items):
+        """Refreshes title and listing time of unchanged items (one transaction)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for item in items:
+                    self._conn.execute(
+                        'UPDATE media SET title = COALESCE(NULLIF(?, \'\'), title), listed_at = ? WHERE media_id = ?',
+                        (item.title, now, item.media_id),
+                    )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def record_download(self, job):
+        """
+        JobQueue on_done hook: if the finished job was queued by a sync, stores the output file's
+        size and SHA-256 and marks the VOD as downloaded. Jobs that aren't in the index are ignored.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT media_id FROM media WHERE job_id = ? AND state = ?',
+                                     (job['id'], QUEUED)).fetchone()
+        if row is None:
+            return
+        output_file = job['output_file']
+        # O hash é calculado fora do lock: arquivos grandes não bloqueiam as outras threads
+        size, digest = os.path.getsize(output_file), file_sha256(output_file)
+        with self._lock:
+            self._conn.execute(
+                'UPDATE media SET state = ?, output_file = ?, file_size = ?, file_hash = ?, downloaded_at = ? '
+                'WHERE media_id = ? AND job_id = ?',
+                (DOWNLOADED, output_file, size, digest, time.time(), row['media_id'], job['id']),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _change_reason(entry, item, variant, store, verify):
+    """Why a listed VOD must be (re)downloaded, or None when the index says it's up to date."""
+    if entry is None:
+        return "novo"
+    if entry['state'] == QUEUED:
+        job = store.get(entry['job_id']) if entry['job_id'] else None
+        if job and job['state'] not in (jobs.DONE, jobs.FAILED, jobs.CANCELLED):
+            return None # Ainda na fila
+        if not job or job['state'] == jobs.FAILED:
+            return "falhou antes"
+        if job['state'] == jobs.CANCELLED:
+            return "cancelado antes"
+        # Concluído, mas o índice não pôde ser atualizado (arquivo removido): cai na checagem do arquivo abaixo
+    if entry['variant'] != variant:
+        return "outra qualidade"
+    if item.duration is not None and entry['duration'] is not None and abs(item.duration - entry['duration']) > 1:
+        return "duração alterada"
+    output_file = entry['output_file']
+    if not output_file or not os.path.exists(output_file) or os.path.getsize(output_file) != entry['file_size']:
+        return "arquivo ausente"
+    if verify and file_sha256(output_file) != entry['file_hash']:
+        return "arquivo alterado"
+    return None
+
+
+def sync(community_url, index, queue, output_dir, cookie_path, cookies, policy=None, verify=False,
+         status_callback=print, endpoints=None):
+    """
+    Lists a community and submits a job to `queue` (a jobs.JobQueue) for each new or changed VOD.
+    Unchanged VODs are only checked by file size (and by hash with verify=True).
+    Returns the list of submitted job ids.
+    """
+    community = community_from_url(community_url)
+    variant = variant_key(policy)
+    listing = list_community(community_url, cookies, endpoints=endpoints, status_callback=status_callback)
+
+    to_queue, unchanged = [], []
+    for item in listing:
+        entry = index.get(item.media_id)
+        if entry and entry['state'] == QUEUED and entry['job_id']:
+            job = queue.store.get(entry['job_id'])
+            if job and job['state'] == jobs.DONE:
+                # O programa foi fechado entre o fim do download e a atualização do índice
+                try:
+                    index.record_download(job)
+                    entry = index.get(item.media_id)
+                except OSError:
+                    pass
+        reason = _change_reason(entry, item, variant, queue.store, verify)
+        if reason:
+            print(f"{item.media_id} ({item.title or item.url}): {reason}")
+            to_queue.append(item)
+        else:
+            unchanged.append(item)
+
+    index.touch(unchanged)
+    # O ID da mídia no nome separa VODs de mesmo título, comuns numa comunidade
+    entries = [(item, queue.submit(item.url, output_file=jobs.output_path(output_dir, item.title, item.media_id),
+                                   cookie_path=cookie_path))
+               for item in to_queue]
+    index.mark_queued(community, entries, variant)
+    for _, job_id in entries:
+        # Um trabalho rápido (URL e segmentos em cache) pode ter terminado antes de entrar no índice
+        job = queue.store.get(job_id)
+        if job and job['state'] == jobs.DONE:
+            index.record_download(job)
+    status_callback(f"{community}: {len(listing)} VOD(s) na listagem, {len(entries)} novo(s) ou alterado(s) na fila.")
+    return [job_id for _, job_id in entries]
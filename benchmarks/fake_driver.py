@@ -0,0 +1,61 @@
+"""
+WebDriver falso que gera logs de desempenho sintéticos para medir a extração da URL do VOD.
+
+Os eventos imitam o formato do Chrome ('message' com JSON de um evento CDP) e chegam em lotes,
+como acontece quando get_log('performance') é chamado várias vezes durante o carregamento.
+"""
+import json
+import random
+
+_NOISE_METHODS = [
+    'Network.dataReceived', 'Network.loadingFinished', 'Page.lifecycleEvent',
+    'Network.requestWillBeSentExtraInfo', 'Page.frameNavigated',
+]
+
+
+def _entry(method, params):
+    return {'level': 'INFO', 'timestamp': 0, 'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+def generate_performance_log(events, manifest_url, manifest_position=0.9, seed=0):
+    """
+    Returns `events` log entries: page/network noise, requests for unrelated assets and,
+    at manifest_position (fraction of the log), the request for manifest_url.
+    """
+    rng = random.Random(seed)
+    entries = []
+    manifest_index = int(events * manifest_position)
+    for i in range(events):
+        if i == manifest_index:
+            entries.append(_entry('Network.requestWillBeSent', {'requestId': str(i), 'request': {'url': manifest_url}}))
+        elif rng.random() < 0.3:
+            asset = rng.choice(['app.js', 'style.css', 'logo.png', 'api/v1/feed', 'font.woff2'])
+            entries.append(_entry('Network.requestWillBeSent', {
+                'requestId': str(i), 'request': {'url': f'https://weverse.io/static/{asset}?v={i}', 'headers': {'x': 'y' * 200}},
+            }))
+        else:
+            entries.append(_entry(rng.choice(_NOISE_METHODS), {'requestId': str(i), 'dataLength': rng.randint(0, 65536)}))
+    return entries
+
+
+class FakeWebDriver:
+    """
+    Minimal stand-in for a Selenium driver: get_log('performance') returns the generated
+    entries in `batches` successive chunks (and nothing afterwards), like a draining log buffer.
+    """
+
+    def __init__(self, entries, batches=20, title="Fake VOD"):
+        self._entries = entries
+        self._batch_size = max(1, len(entries) // batches)
+        self._position = 0
+        self.title = title
+
+    def get_log(self, log_type):
+        if log_type != 'performance':
+            return []
+        batch = self._entries[self._position:self._position + self._batch_size]
+        self._position += len(batch)
+        return batch
+
+    def find_elements(self, *args):
+        return []
@@ -0,0 +1,231 @@
+"""
+Servidor HTTP local com fixtures HLS/DASH para os benchmarks.
+
+Serve arquivos mantidos em memória e permite injetar latência por requisição,
+limite de banda por conexão e uma taxa de erros HTTP 503. Também serve playlists ao vivo
+que avançam a cada leitura, para testar o gravador.
+"""
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_CHUNK = 64 * 1024
+
+
+class FixtureServer:
+    """
+    Serves `files` (path -> bytes, or a callable returning the bytes of each request) on 127.0.0.1.
+    latency: seconds added before every response; bandwidth: bytes/s per connection (0 = unlimited);
+    error_rate: fraction of segment requests answered with 503.
+    """
+
+    def __init__(self, files, latency=0.0, bandwidth=0, error_rate=0.0, seed=0):
+        self.files = files
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.hits = Counter() # Requisições por caminho
+        self.request_headers = {} # Caminho -> cabeçalhos da última requisição
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _should_fail(self, path):
+        if not self.error_rate or path.endswith(('.m3u8', '.mpd')):
+            return False
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return fail
+
+    def start(self):
+        """Starts serving in a background thread and returns the base URL."""
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, send_body):
+                path = self.path.split('?', 1)[0]
+                with fixture._lock:
+                    fixture.requests += 1
+                    fixture.hits[path] += 1
+                    fixture.request_headers[path] = dict(self.headers)
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+                body = fixture.files.get(path)
+                if callable(body):
+                    body = body()
+                if body is None or fixture._should_fail(path):
+                    status = 404 if body is None else 503
+                    self.send_response(status)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                status = 200
+                byte_range = self.headers.get('Range')
+                if byte_range and byte_range.startswith('bytes='):
+                    start, _, end = byte_range[6:].partition('-')
+                    start = int(start)
+                    end = int(end) if end else len(body) - 1
+                    body = body[start:end + 1]
+                    status = 206
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not send_body:
+                    return
+                for offset in range(0, len(body), _CHUNK):
+                    chunk = body[offset:offset + _CHUNK]
+                    self.wfile.write(chunk)
+                    if fixture.bandwidth:
+                        time.sleep(len(chunk) / fixture.bandwidth)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def synthetic_hls(segments, segment_size, duration=4.0):
+    """An HLS VOD (master + media playlist) whose segments are filler bytes; fine for the native engine, not for ffmpeg."""
+    files = {
+        '/hls/master.m3u8': (
+            "#EXTM3U\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\nlow.m3u8\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\nmedia.m3u8\n"
+        ).encode(),
+    }
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{int(duration)}', '#EXT-X-MEDIA-SEQUENCE:0']
+    for i in range(segments):
+        files[f'/hls/seg{i}.ts'] = bytes([i % 256]) * segment_size
+        lines += [f'#EXTINF:{duration:.3f},', f'seg{i}.ts']
+    lines.append('#EXT-X-ENDLIST')
+    files['/hls/media.m3u8'] = ('\n'.join(lines) + '\n').encode()
+    return files
+
+
+class LivePlaylist:
+    """
+    A live HLS media playlist that rolls forward one segment every time it is fetched, showing a sliding
+    window of the last `window` segments and EXT-X-ENDLIST once the last one is out.
+    `streams` is a list of (first media sequence, segment URIs); each stream after the first is a restart
+    of the broadcast, whose numbering starts over from its own first sequence (it may reuse old numbers).
+    Serve it by putting the instance itself in FixtureServer's files.
+    """
+
+    def __init__(self, streams, window=3, duration=0.1):
+        self.window = window
+        self.duration = duration
+        self.timeline = [(number, first + offset, uri)
+                         for number, (first, uris) in enumerate(streams)
+                         for offset, uri in enumerate(uris)]
+        self.position = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            number = self.timeline[self.position][0]
+            visible = [item for item in self.timeline[:self.position + 1] if item[0] == number][-self.window:]
+            ended = self.position == len(self.timeline) - 1
+            self.position = min(self.position + 1, len(self.timeline) - 1)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{self.duration}',
+                 f'#EXT-X-MEDIA-SEQUENCE:{visible[0][1]}']
+        for _, _, uri in visible:
+            lines += [f'#EXTINF:{self.duration:.3f},', uri]
+        if ended:
+            lines.append('#EXT-X-ENDLIST')
+        return ('\n'.join(lines) + '\n').encode()
+
+
+def synthetic_live(streams, segment_size, window=3, duration=0.1):
+    """
+    A rolling live HLS stream at /live/media.m3u8 (see LivePlaylist); streams is a list of
+    (first media sequence, segment count), and segment i of stream n is /live/s{n}_{i}.ts.
+    """
+    files = {}
+    playlist_streams = []
+    for number, (first, count) in enumerate(streams):
+        uris = []
+        for i in range(count):
+            uris.append(f's{number}_{i}.ts')
+            files[f'/live/s{number}_{i}.ts'] = bytes([(number * 16 + i) % 256]) * segment_size
+        playlist_streams.append((first, uris))
+    files['/live/media.m3u8'] = LivePlaylist(playlist_streams, window, duration)
+    return files
+
+
+def real_hls(seconds, segment_seconds=2):
+    """Encodes a test-pattern HLS VOD with ffmpeg so the ffmpeg baseline can be measured. Requires ffmpeg."""
+    directory = tempfile.mkdtemp(prefix='weverse_bench_')
+    try:
+        command = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc=size=1280x720:rate=30:duration={seconds}',
+            '-c:v', 'mpeg2video', '-b:v', '6M', '-g', str(30 * segment_seconds),
+            '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_list_size', '0',
+            '-hls_segment_filename', os.path.join(directory, 'seg%d.ts'),
+            os.path.join(directory, 'media.m3u8'),
+        ]
+        subprocess.run(command, check=True)
+        files = {}
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name), 'rb') as f:
+                files[f'/hls/{name}'] = f.read()
+        files['/hls/master.m3u8'] = b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=6000000,RESOLUTION=1280x720\nmedia.m3u8\n"
+        return files
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def synthetic_dash(segments, segment_size, duration=4):
+    """A static DASH VOD (SegmentTemplate, one video and one audio representation) with filler segments."""
+    total = segments * duration
+    files = {
+        '/dash/vod.mpd': f'''<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT{total}S">
+ <Period>
+  <AdaptationSet contentType="video" mimeType="video/mp4">
+   <SegmentTemplate media="$RepresentationID$_$Number$.m4s" initialization="$RepresentationID$_init.mp4"
+                    startNumber="1" timescale="1" duration="{duration}"/>
+   <Representation id="video" bandwidth="5000000" width="1920" height="1080" codecs="avc1.640028"/>
+  </AdaptationSet>
+  <AdaptationSet contentType="audio" mimeType="audio/mp4">
+   <SegmentTemplate media="$RepresentationID$_$Number$.m4s" initialization="$RepresentationID$_init.mp4"
+                    startNumber="1" timescale="1" duration="{duration}"/>
+   <Representation id="audio" bandwidth="128000" codecs="mp4a.40.2"/>
+  </AdaptationSet>
+ </Period>
+</MPD>
+'''.encode(),
+        '/dash/video_init.mp4': b'\x00' * 1024,
+        '/dash/audio_init.mp4': b'\x00' * 512,
+    }
+    for number in range(1, segments + 1):
+        files[f'/dash/video_{number}.m4s'] = bytes([number % 256]) * segment_size
+        files[f'/dash/audio_{number}.m4s'] = bytes([number % 256]) * max(1, segment_size // 20)
+    return files
@@ -0,0 +1,312 @@
+"""
+Benchmark offline de resolução e download.
+
+Sobe um servidor local com fixtures HLS/DASH (com latência, limite de banda e erros injetáveis),
+roda cada cenário num subprocesso separado (para medir o pico de memória de cada um) e salva os
+resultados em JSON, para comparar regressões entre commits:
+
+    python benchmarks/run.py --segments 200 --latency 0.05 --output bench.json
+    python benchmarks/run.py --compare bench.json
+
+Cenários:
+  hls-native   motor HLS nativo (download dos segmentos; remux medido à parte quando há ffmpeg)
+  hls-ffmpeg   caminho antigo, ffmpeg -i <m3u8> -c copy (só com ffmpeg e mídia real)
+  dash-native  motor DASH nativo (vídeo e áudio em paralelo, sem o mux final)
+  log-parse    varredura do log de desempenho e captura da URL com um WebDriver falso
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ['hls-native', 'hls-ffmpeg', 'dash-native', 'log-parse']
+COMPARED_METRICS = ['seconds', 'mb_per_s', 'segments_per_s', 'ttfb_s', 'peak_rss_mb', 'parse_s', 'capture_s']
+
+
+def peak_rss_mb(children=False):
+    """Peak resident memory of this process (or of its finished children) in MB; None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return usage.ru_maxrss / (1048576 if sys.platform == 'darwin' else 1024)
+
+
+class _Progress:
+    """status_callback that records when the first segment landed."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_segment = None
+
+    def __call__(self, message):
+        if self.first_segment is None and 'segmento' in message:
+            self.first_segment = time.perf_counter() - self.start
+
+
+def _rates(result, total_bytes, segments):
+    result['bytes'] = total_bytes
+    result['segments'] = segments
+    result['mb_per_s'] = total_bytes / 1048576 / result['seconds'] if result['seconds'] else None
+    result['segments_per_s'] = segments / result['seconds'] if result['seconds'] else None
+    return result
+
+
+def run_hls_native(params, workdir):
+    import hls
+    from journal import SegmentJournal
+    from network import HttpPool
+
+    pool = HttpPool(max_idle_per_host=params['concurrency'])
+    progress = _Progress()
+    playlist, media_url = hls.load_media_playlist(pool, params['base_url'] + '/hls/master.m3u8')
+    part_file = os.path.join(workdir, 'hls.part.ts')
+    journal = SegmentJournal(os.path.join(workdir, 'hls'))
+    hls.download_segments(pool, playlist.segments, part_file, journal, media_url, progress, params['concurrency'])
+    journal.close()
+    result = _rates({'seconds': time.perf_counter() - progress.start, 'ttfb_s': progress.first_segment},
+                    os.path.getsize(part_file), len(playlist.segments))
+    pool.close()
+
+    if params['ffmpeg'] and params['real_media']:
+        from mux import remux
+        start = time.perf_counter()
+        remux([part_file], os.path.join(workdir, 'hls.mp4'))
+        result['remux_s'] = time.perf_counter() - start
+    return result
+
+
+def run_hls_ffmpeg(params, workdir):
+    if not params['ffmpeg'] or not params['real_media']:
+        return {'skipped': 'requer ffmpeg no PATH (a fixture precisa ser mídia real)'}
+    output_file = os.path.join(workdir, 'ffmpeg.mp4')
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'warning', '-y',
+               '-i', params['base_url'] + '/hls/master.m3u8', '-c', 'copy', output_file]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ttfb = None
+    while process.poll() is None:
+        if ttfb is None and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            ttfb = time.perf_counter() - start
+        time.sleep(0.01)
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        return {'error': f'ffmpeg saiu com código {process.returncode}', 'seconds': seconds}
+    result = _rates({'seconds': seconds, 'ttfb_s': ttfb}, params['hls_bytes'], params['hls_segments'])
+    result['ffmpeg_peak_rss_mb'] = peak_rss_mb(children=True)
+    return result
+
+
+def run_dash_native(params, workdir):
+    import dash
+    import hls
+    from journal import SegmentJournal
+    from network import HttpPool
+
+    pool = HttpPool(max_idle_per_host=params['concurrency'] * 2)
+    progress = _Progress()
+    mpd_url = params['base_url'] + '/dash/vod.mpd'
+    text, final_url = pool.get_text(mpd_url)
+    representations = dash.parse_mpd(text, final_url)
+    tracks = [hls.select_variant([r for r in representations if r['kind'] == kind]) for kind in ('video', 'audio')]
+
+    totals = []
+    errors = []
+
+    def download(index, representation):
+        try:
+            segments, _ = dash.representation_segments(pool, representation)
+            part_file = os.path.join(workdir, f'dash{index}.part.mp4')
+            journal = SegmentJournal(os.path.join(workdir, f'dash{index}'))
+            hls.download_segments(pool, segments, part_file, journal, segments[0].uri, progress, params['concurrency'])
+            journal.close()
+            totals.append((os.path.getsize(part_file), len(segments)))
+        except Exception as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=download, args=(i, r)) for i, r in enumerate(tracks)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    if errors:
+        return {'error': errors[0]}
+    return _rates({'seconds': time.perf_counter() - progress.start, 'ttfb_s': progress.first_segment},
+                  sum(size for size, _ in totals), sum(count for _, count in totals))
+
+
+def run_log_parse(params, workdir):
+    from fake_driver import FakeWebDriver, generate_performance_log
+    try:
+        # Só do núcleo sem interface: importar downloader.py abre a janela Tk
+        from core import network_log_url, capture_video_url_from_network
+    except Exception as e:
+        return {'skipped': f'não foi possível importar as funções de extração ({e})'}
+
+    manifest = 'https://example.cloudfront.net/vod/master.m3u8?Expires=1'
+    entries = generate_performance_log(params['log_events'], manifest)
+
+    # Varredura completa (estratégia 2 de extract_video_url_for_vods)
+    start = time.perf_counter()
+    found = [url for url in (network_log_url(entry['message']) for entry in entries) if url and '.m3u8' in url]
+    parse_s = time.perf_counter() - start
+
+    # Captura incremental com saída antecipada
+    start = time.perf_counter()
+    captured = capture_video_url_from_network(FakeWebDriver(entries), lambda message: None, timeout=30, poll_interval=0)
+    capture_s = time.perf_counter() - start
+    return {
+        'events': len(entries),
+        'parse_s': parse_s,
+        'events_per_s': len(entries) / parse_s if parse_s else None,
+        'capture_s': capture_s,
+        'found': bool(found) and captured == manifest,
+    }
+
+
+RUNNERS = {
+    'hls-native': run_hls_native,
+    'hls-ffmpeg': run_hls_ffmpeg,
+    'dash-native': run_dash_native,
+    'log-parse': run_log_parse,
+}
+
+
+def run_child(scenario, params):
+    """Runs one scenario in this (fresh) process and prints its result as JSON."""
+    workdir = tempfile.mkdtemp(prefix='weverse_bench_')
+    try:
+        try:
+            result = RUNNERS[scenario](params, workdir)
+        except Exception as e:
+            result = {'error': f'{type(e).__name__}: {e}'}
+        if 'skipped' not in result:
+            result['peak_rss_mb'] = peak_rss_mb()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(result))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path, current):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nComparação com {previous_path} (commit {previous.get('commit')}):")
+    for scenario, result in current['results'].items():
+        old = previous.get('results', {}).get(scenario, {})
+        for metric in COMPARED_METRICS:
+            new_value, old_value = result.get(metric), old.get(metric)
+            if isinstance(new_value, (int, float)) and isinstance(old_value, (int, float)) and old_value:
+                change = (new_value - old_value) / old_value * 100
+                print(f"  {scenario:12} {metric:15} {old_value:10.3f} -> {new_value:10.3f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do weverse_downloader.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Cenários separados por vírgula.")
+    parser.add_argument('--segments', type=int, default=100, help="Segmentos por fixture (HLS/DASH).")
+    parser.add_argument('--segment-size', type=int, default=512 * 1024, help="Bytes por segmento sintético.")
+    parser.add_argument('--latency', type=float, default=0.05, help="Latência por requisição (s).")
+    parser.add_argument('--bandwidth', type=float, default=0, help="Limite de banda por conexão (MB/s, 0 = sem limite).")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fração de segmentos respondidos com 503.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Conexões paralelas dos motores nativos.")
+    parser.add_argument('--log-events', type=int, default=50000, help="Eventos no log de desempenho falso.")
+    parser.add_argument('--media', choices=['auto', 'real', 'synthetic'], default='auto',
+                        help="'real' gera a fixture HLS com ffmpeg (necessário para o cenário hls-ffmpeg).")
+    parser.add_argument('--timeout', type=float, default=600, help="Tempo máximo de cada cenário (s).")
+    parser.add_argument('--output', help="Arquivo JSON para salvar os resultados.")
+    parser.add_argument('--compare', help="JSON de uma execução anterior para comparar.")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--params', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(args.params))
+        return
+
+    from fixture_server import FixtureServer, synthetic_hls, synthetic_dash, real_hls
+
+    has_ffmpeg = shutil.which('ffmpeg') is not None
+    real_media = args.media == 'real' or (args.media == 'auto' and has_ffmpeg)
+    if real_media:
+        print("Gerando fixture HLS real com ffmpeg...")
+        files = real_hls(args.segments * 2)
+    else:
+        files = synthetic_hls(args.segments, args.segment_size)
+    hls_segments = [path for path in files if path.endswith('.ts')]
+    files.update(synthetic_dash(args.segments, args.segment_size))
+
+    server = FixtureServer(files, latency=args.latency, bandwidth=args.bandwidth * 1048576, error_rate=args.error_rate)
+    base_url = server.start()
+    params = {
+        'base_url': base_url,
+        'concurrency': args.concurrency,
+        'log_events': args.log_events,
+        'ffmpeg': has_ffmpeg,
+        'real_media': real_media,
+        'hls_segments': len(hls_segments),
+        'hls_bytes': sum(len(files[path]) for path in hls_segments),
+    }
+
+    results = {}
+    try:
+        for scenario in args.scenarios.split(','):
+            print(f"Rodando {scenario}...")
+            requests_before, errors_before = server.requests, server.errors
+            try:
+                child = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child', scenario, '--params', json.dumps(params)],
+                    capture_output=True, text=True, timeout=args.timeout
+                )
+            except subprocess.TimeoutExpired:
+                # Um cenário travado (servidor parado, import que abre uma janela) não segura os demais
+                result = {'error': f'tempo esgotado ({args.timeout:.0f}s)'}
+            else:
+                lines = child.stdout.strip().splitlines()
+                try:
+                    result = json.loads(lines[-1])
+                except (IndexError, json.JSONDecodeError):
+                    result = {'error': child.stderr.strip()[-500:] or 'sem saída'}
+            result['http_requests'] = server.requests - requests_before
+            result['injected_errors'] = server.errors - errors_before
+            results[scenario] = result
+            print(json.dumps(result, indent=2))
+    finally:
+        server.stop()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('child', 'params', 'output', 'compare', 'timeout')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em {args.output}")
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Linha de comando do weverse_downloader (sem interface gráfica, funciona em servidores sem tela).
+
+    python cli.py https://weverse.io/.../media/123 -c cookies.json -o video.mp4
+    python cli.py --list urls.txt -c cookies.json -o pasta/ --quality 720p
+    python cli.py https://weverse.io/.../media/123 --start 1:10:00 --end 1:12:00
+    python cli.py --sync https://weverse.io/artista/media -c cookies.json -o arquivo/
+    python cli.py --server http://127.0.0.1:8765 https://weverse.io/.../media/123
+
+Ctrl+C encerra as gravações ao vivo em andamento, salvando o que já foi gravado.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+import urllib.error
+
+import core
+import jobs
+
+
+def read_url_list(path):
+    """Reads a text file with one URL per line (blank lines and # comments are ignored)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def run(urls, output, cookie_path, policy, concurrency, pipe, clip=None):
+    """Downloads each URL in turn and returns the number of failures."""
+    failures = 0
+    for url in urls:
+        try:
+            output_file = core.main(url, output, print, cookie_path=cookie_path, policy=policy,
+                                    concurrency=concurrency, pipe=pipe, clip=clip)
+            print(f"Salvo: {output_file}")
+        except Exception as e:
+            failures += 1
+            print(f"Falha ao baixar {url}: {e}", file=sys.stderr)
+    return failures
+
+
+def sync(community_urls, output_dir, cookie_path, policy, concurrency):
+    """
+    Syncs each community: queues its new or changed VODs in the persistent job queue and waits
+    until they are done. Returns the number of failed jobs. Refuses to run while daemon.py owns the queue.
+    """
+    def download(video_url, output_file, status_callback):
+        core.download_video(video_url, output_file, status_callback, concurrency=concurrency, policy=policy)
+
+    queue = jobs.JobQueue(
+        jobs.JobStore(core.JOBS_DB), core.resolve_video, download, print,
+        resolve_workers=core.RESOLVE_WORKERS, download_workers=core.DOWNLOAD_WORKERS,
+        metrics_sinks=core.get_metrics_sinks(), on_done=core.get_archive_index().record_download,
+    )
+    try:
+        queue.start()
+    except jobs.StoreInUseError as e:
+        print(f"{e} Use --server para enviar as URLs ao serviço.", file=sys.stderr)
+        return len(community_urls)
+    try:
+        job_ids, failures = [], 0
+        for community_url in community_urls:
+            try:
+                job_ids += core.sync_community(community_url, queue, output_dir, cookie_path, policy)
+            except Exception as e:
+                failures += 1
+                print(f"Falha ao listar {community_url}: {e}", file=sys.stderr)
+        while True:
+            states = [queue.store.get(job_id)['state'] for job_id in job_ids]
+            if all(state in (jobs.DONE, jobs.FAILED, jobs.CANCELLED) for state in states):
+                return failures + states.count(jobs.FAILED)
+            time.sleep(1)
+    finally:
+        queue.stop(timeout=1)
+
+
+def submit(server, urls, output, cookie_path):
+    """Sends the URLs to a running daemon.py (which reuses its browsers and sessions). Returns the job ids."""
+    body = {'urls': urls, 'cookie_path': cookie_path and os.path.abspath(cookie_path)}
+    if output:
+        body['output_file' if len(urls) == 1 and not os.path.isdir(output) else 'output_dir'] = os.path.abspath(output)
+    request = urllib.request.Request(server.rstrip('/') + '/jobs', data=json.dumps(body).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)['ids']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baixa VODs e transmissões ao vivo do Weverse.")
+    parser.add_argument('urls', nargs='*', help="URLs das páginas dos VODs.")
+    parser.add_argument('-l', '--list', help="Arquivo de texto com uma URL por linha.")
+    parser.add_argument('-s', '--sync', action='append', default=[], metavar='URL_DA_COMUNIDADE',
+                        help="Baixa só os VODs novos ou alterados da comunidade (pode ser repetido).")
+    parser.add_argument('-o', '--output', help="Arquivo de saída (uma URL) ou pasta (várias URLs). Padrão: pasta atual, com o título da página.")
+    parser.add_argument('-c', '--cookies', help="Arquivo de cookies do Weverse (JSON salvo pelo navegador).")
+    parser.add_argument('-q', '--quality', choices=list(core.QUALITY_PRESETS), default='best', help="Qualidade do vídeo.")
+    parser.add_argument('-j', '--concurrency', type=int, default=core.HLS_CONCURRENCY, help="Segmentos baixados em paralelo.")
+    parser.add_argument('--start', type=core.parse_timestamp, metavar='TEMPO',
+                        help="Início do recorte (segundos, M:SS ou H:MM:SS); só os segmentos do trecho são baixados.")
+    parser.add_argument('--end', type=core.parse_timestamp, metavar='TEMPO', help="Fim do recorte.")
+    parser.add_argument('--server', help="Envia as URLs para um daemon.py em execução em vez de baixar neste processo.")
+    parser.add_argument('--pipe', action='store_true', default=core.PIPE_TO_FFMPEG,
+                        help="Envia os segmentos direto para o ffmpeg, sem arquivo parcial (não retoma downloads interrompidos).")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.list:
+        urls += read_url_list(args.list)
+    if not urls and not args.sync:
+        parser.error("informe ao menos uma URL, --list ou --sync")
+    clip = (args.start, args.end) if args.start is not None or args.end is not None else None
+    if clip and args.end is not None and args.end <= (args.start or 0):
+        parser.error("--end precisa ser depois de --start")
+    if clip and (args.server or args.sync):
+        parser.error("--start/--end não valem com --server ou --sync")
+    if args.server:
+        if not urls:
+            parser.error("--server precisa de URLs")
+        try:
+            job_ids = submit(args.server, urls, args.output, args.cookies)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"Falha ao enviar para {args.server}: {e}", file=sys.stderr)
+            return 1
+        print(f"Trabalho(s) na fila do serviço: {', '.join(map(str, job_ids))}")
+        return 0
+    if args.sync:
+        # A sincronização sempre grava numa pasta, com o título de cada VOD
+        args.output = args.output or '.'
+        os.makedirs(args.output, exist_ok=True)
+    elif args.output and (len(urls) > 1 or args.output.endswith(('/', '\\'))):
+        # Várias URLs: a saída é sempre uma pasta
+        os.makedirs(args.output, exist_ok=True)
+
+    # O download roda numa thread para que o Ctrl+C possa encerrar gravações ao vivo de forma limpa
+    result = {}
+
+    def work():
+        policy = core.QUALITY_PRESETS[args.quality]
+        result['failures'] = run(urls, args.output, args.cookies, policy, args.concurrency, args.pipe, clip) if urls else 0
+        if args.sync:
+            result['failures'] += sync(args.sync, args.output, args.cookies, policy, args.concurrency)
+
+    worker = threading.Thread(target=work, daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        if not core.live_recordings:
+            raise
+        print("Encerrando gravações ao vivo...")
+        for stop_event in list(core.live_recordings):
+            stop_event.set()
+        worker.join()
+    finally:
+        if core.segment_cache_instance:
+            stats = core.segment_cache_instance.stats()
+            print(f"Cache de segmentos: {stats['hits']} acertos, {stats['misses']} faltas "
+                  f"({stats['hit_rate']:.0%}), {stats['bytes'] / 1048576:.0f} MB em disco.")
+        core.close()
+    return 1 if result.get('failures', 1) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,744 @@
+"""
+Funções principais do weverse_downloader, sem interface gráfica.
+
+Resolve a URL direta de um VOD (sem navegador quando possível, senão com um Chrome headless
+do pool) e baixa o vídeo pelos motores nativos. Pode ser importado por outros programas
+(agendadores, scripts) e é usado tanto pela interface Tkinter (downloader.py) quanto pela
+linha de comando (cli.py). Selenium e webdriver_manager só são importados quando um
+navegador é realmente necessário.
+"""
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+
+import hls
+import live
+import dash
+import driver_pool
+import resolver
+import url_cache
+import metrics
+import session
+import segment_cache
+import scheduler
+import archive
+import prefetch
+from network import HttpPool, HttpError
+
+# --- Variáveis Globais para Cookies ---
+COOKIES_FILE = "weverse_cookies.json" # Nome do arquivo para salvar os cookies
+
+# --- Configuração do download ---
+HLS_CONCURRENCY = 8 # Número de segmentos HLS baixados em paralelo pelo motor nativo
+PIPE_TO_FFMPEG = False # Envia os segmentos .ts direto para o ffmpeg, sem arquivo parcial (grava cada byte uma vez, mas não retoma)
+
+# Políticas de escolha da variante (qualidade) em playlists master e manifestos DASH
+QUALITY_PRESETS = {
+    'best': hls.VariantPolicy(),
+    '1080p': hls.VariantPolicy(max_height=1080),
+    '720p': hls.VariantPolicy(max_height=720),
+    '480p': hls.VariantPolicy(max_height=480),
+    'min-720p': hls.VariantPolicy(min_height=720),
+    'worst': hls.VariantPolicy(quality='worst'),
+}
+
+# --- Cache de URLs resolvidas ---
+MEDIA_URL_CACHE_FILE = "weverse_media_cache.json" # Página do VOD -> URL do manifesto, título, miniatura, duração e variantes
+PREFETCH_WORKERS = 2 # URLs cujos metadados são buscados ao mesmo tempo em segundo plano
+
+# --- Configuração da captura de rede ---
+NETWORK_CAPTURE_TIMEOUT = 20 # Segundos esperando o manifesto aparecer nas requisições da página
+NETWORK_CAPTURE_POLL = 0.25 # Intervalo entre leituras do log de desempenho
+
+# --- Configuração da fila de downloads em lote ---
+JOBS_DB = "weverse_jobs.sqlite3" # Banco SQLite com o estado dos trabalhos em lote
+RESOLVE_WORKERS = 1 # Navegadores abertos ao mesmo tempo para encontrar URLs de VOD
+DOWNLOAD_WORKERS = 2 # Downloads simultâneos
+
+# --- Configuração do pool de navegadores ---
+DRIVER_POOL_SIZE = 2 # Navegadores headless mantidos abertos entre trabalhos
+DRIVER_MAX_PAGES = 50 # Páginas abertas por um navegador antes de ser reciclado
+DRIVER_MAX_HEAP_MB = 512 # Heap JavaScript máximo (MB) antes de reciclar o navegador
+
+# --- Cache de segmentos ---
+SEGMENT_CACHE_DIR = None # Pasta dos segmentos já baixados, reaproveitados entre trabalhos (ex: "weverse_segment_cache"; None desativa)
+SEGMENT_CACHE_MAX_MB = 2048 # Tamanho máximo do cache de segmentos
+
+# --- Sincronização de comunidades ---
+ARCHIVE_DB = "weverse_archive.sqlite3" # Índice dos VODs das comunidades sincronizadas e dos arquivos baixados
+
+# --- Agendamento da rede (compartilhado por todos os downloads) ---
+MAX_CONNECTIONS_PER_HOST = 8 # Conexões simultâneas a cada servidor da CDN, somando todos os downloads
+BANDWIDTH_LIMIT_MB = None # Banda máxima de todos os downloads juntos, em MB/s (None = sem limite)
+JOB_BANDWIDTH_LIMIT_MB = None # Banda máxima de cada download, em MB/s (None = sem limite)
+
+# --- Métricas de desempenho ---
+METRICS_JSONL_FILE = "weverse_metrics.jsonl" # Eventos de progresso e métricas de cada trabalho (None desativa)
+METRICS_PROMETHEUS_FILE = "weverse_metrics.prom" # Totais no formato texto do Prometheus (None desativa)
+
+# --- Funções Core ---
+
+class VideoNotFoundError(Exception):
+    """Raised by main when no direct video URL could be found for the page."""
+
+# Usado como último recurso por extract_video_url_for_vods, quando a página é uma transmissão ao vivo
+def extract_video_url_from_live_logs(logs):
+    """
+    Extracts a direct video URL (m3u8/mp4) from network logs, typically for live streams.
+    """
+    for log in logs:
+        url = network_log_url(log['message'])
+        if url and ('.m3u8' in url or '.mp4' in url):
+            if 'weverse' in url and ('video' in url or 'stream' in url):
+                return url
+    return None
+
+# Só entradas destes eventos (e que mencionem um tipo de mídia) chegam a passar pelo json.loads
+_NETWORK_EVENTS = ('"Network.requestWillBeSent"', '"Network.responseReceived"')
+_MEDIA_MARKERS = ('.m3u8', '.mpd', '.mp4', 'manifest.json')
+
+def network_log_url(raw_message):
+    """
+    Returns the URL of a Network.requestWillBeSent / Network.responseReceived performance-log
+    entry that mentions a media type, or None. Unrelated entries are rejected with substring
+    checks, without parsing their JSON.
+    """
+    if not any(event in raw_message for event in _NETWORK_EVENTS):
+        return None
+    if not any(marker in raw_message for marker in _MEDIA_MARKERS):
+        return None
+    try:
+        message = json.loads(raw_message).get('message', {})
+    except json.JSONDecodeError:
+        return None
+    params = message.get('params', {})
+    if message.get('method') == 'Network.requestWillBeSent':
+        return params.get('request', {}).get('url')
+    if message.get('method') == 'Network.responseReceived':
+        return params.get('response', {}).get('url')
+    return None
+
+def capture_video_url_from_network(driver, status_callback, timeout=NETWORK_CAPTURE_TIMEOUT, poll_interval=NETWORK_CAPTURE_POLL,
+                                   media_logs=None):
+    """
+    Streams the browser's network events while the page loads and returns as soon as the first
+    HLS (.m3u8) or DASH (.mpd) request to a known video host shows up.
+    Each poll drains only the entries logged since the previous one, so nothing accumulates in the driver.
+    If no manifest appears before the timeout, returns the best .mp4/manifest.json seen, or None.
+    Entries that carry a media URL are appended to `media_logs` (a list), since the driver no longer has them.
+    """
+    status_callback("Capturando requisições de rede da página...")
+    fallback = {}
+    deadline = time.monotonic() + timeout
+    while True:
+        manifests = {}
+        for entry in driver.get_log('performance'):
+            url = network_log_url(entry['message'])
+            if url and media_logs is not None:
+                media_logs.append(entry)
+            if not url or not any(domain in url for domain in resolver.MEDIA_HOSTS):
+                continue
+            if '.m3u8' in url:
+                manifests.setdefault('m3u8', url)
+            elif '.mpd' in url:
+                manifests.setdefault('mpd', url)
+            elif '.mp4' in url:
+                fallback.setdefault('mp4', url)
+            elif 'manifest.json' in url:
+                fallback.setdefault('manifest.json', url)
+        # Num mesmo lote, HLS tem prioridade sobre DASH
+        video_url = manifests.get('m3u8') or manifests.get('mpd')
+        if video_url:
+            status_callback(f"Manifesto capturado nas requisições de rede: {video_url}")
+            print(f"Manifest captured from network events: {video_url}")
+            return video_url
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(poll_interval)
+    return fallback.get('mp4') or fallback.get('manifest.json')
+
+def save_cookies(driver, status_callback):
+    """
+    Saves browser cookies to a JSON file.
+    Expects the driver to be in a logged-in state on Weverse. Returns True on success.
+    """
+    try:
+        # Navegar para um domínio base do Weverse para garantir que os cookies corretos sejam recuperados
+        # (se o driver não estiver em uma página do Weverse)
+        driver.get("https://weverse.io/home") # Ou outra URL base do Weverse
+        time.sleep(2) # Pequena espera para carregar a página
+        
+        cookies = driver.get_cookies()
+        with open(COOKIES_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cookies, f, indent=2)
+        status_callback(f"Cookies salvos em '{COOKIES_FILE}'.")
+        return True
+    except Exception as e:
+        status_callback(f"Erro ao salvar cookies: {e}")
+        return False
+
+def extract_video_url_for_vods(driver, status_callback, logs=None, dom_timeout=15):
+    """
+    Tenta extrair a URL de um VOD (Vídeo On Demand) do Weverse.
+    Prioriza a busca em elementos DOM e depois em logs de rede.
+    logs: entradas do log de desempenho já lidas do driver (ex: por capture_video_url_from_network),
+    analisadas junto com as que chegaram depois. dom_timeout: segundos de espera pela tag <video>.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+
+    status_callback("Tentando encontrar URL do VOD...")
+    print("Tentando encontrar URL do VOD...")
+
+    video_url = None
+
+    # --- ESTRATÉGIA 1: Tentar encontrar URLs em tags de vídeo ou scripts ---
+    try:
+        # Tenta encontrar a tag <video> e seu atributo src
+        video_element = WebDriverWait(driver, dom_timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'video[src]'))
+        )
+        video_src = video_element.get_attribute('src')
+        if video_src and (video_src.startswith('http://') or video_src.startswith('https://')):
+            print(f"Found video src attribute: {video_src}")
+            status_callback("URL de vídeo encontrada na tag <video>.")
+            return video_src
+        elif video_src and video_src.startswith('blob:'):
+            print("Ignorando URL blob, não é possível baixar diretamente.")
+    except TimeoutException:
+        print(f"Timeout: <video> tag not found within {dom_timeout} seconds.")
+    except Exception as e:
+        print(f"Error finding <video> tag src: {e}")
+        
+    # Tenta encontrar elementos <source> dentro de <video>
+    try:
+        source_elements = driver.find_elements(By.CSS_SELECTOR, 'video > source[src]')
+        for source in source_elements:
+            src = source.get_attribute('src')
+            if src and ('.m3u8' in src or '.mp4' in src or '.mpd' in src):
+                print(f"Found video src in <source> tag: {src}")
+                status_callback("URL de vídeo encontrada na tag <source>.")
+                return src
+    except Exception as e:
+        print(f"Error finding <source> tag src: {e}")
+
+    # --- ESTRATÉGIA 2: Análise de logs de desempenho (mais comum para streaming adaptativo) ---
+    status_callback("Analisando logs de rede para URL de VOD...")
+    # get_log esvazia o buffer do driver: o que a captura já leu só existe em `logs`
+    logs = (logs or []) + driver.get_log('performance')
+
+    found_urls = {
+        'm3u8': None,
+        'mp4': None,
+        'mpd': None,
+        'manifest.json': None
+    }
+
+    for log in logs:
+        url = network_log_url(log['message'])
+        if url:
+            # Filtrar por domínios que geralmente hospedam conteúdo de vídeo do Weverse
+            if any(domain in url for domain in resolver.MEDIA_HOSTS):
+                if '.m3u8' in url:
+                    found_urls['m3u8'] = url
+                elif '.mp4' in url:
+                    found_urls['mp4'] = url
+                elif '.mpd' in url:
+                    found_urls['mpd'] = url
+                elif 'manifest.json' in url:
+                    found_urls['manifest.json'] = url
+
+    # Prioridade de retorno: M3U8 (HLS) > MPD (DASH) > MP4 > Manifest (pode ser o próprio MPD/M3U8)
+    if found_urls['m3u8']:
+        video_url = found_urls['m3u8']
+        status_callback(f"URL de VOD (.m3u8) encontrada nos logs: {video_url}")
+    elif found_urls['mpd']:
+        video_url = found_urls['mpd']
+        status_callback(f"URL de VOD (.mpd) encontrada nos logs: {video_url}")
+    elif found_urls['mp4']:
+        video_url = found_urls['mp4']
+        status_callback(f"URL de VOD (.mp4) encontrada nos logs: {video_url}")
+    elif found_urls['manifest.json']:
+        video_url = found_urls['manifest.json']
+        status_callback(f"URL de VOD (manifest.json) encontrada nos logs: {video_url}")
+    else:
+        video_url = extract_video_url_from_live_logs(logs)
+        if video_url:
+            status_callback(f"URL de transmissão ao vivo encontrada nos logs: {video_url}")
+
+    if video_url:
+        print(f"Direct VOD link found: {video_url}")
+        return video_url
+    else:
+        status_callback("Nenhuma URL de VOD direta encontrada pelos métodos conhecidos.")
+        print("Could not find direct video URL for VODs using current methods.")
+        return None
+
+segment_cache_instance = None
+segment_cache_lock = threading.Lock()
+
+def get_segment_cache():
+    """Returns the segment cache shared by all downloads of this process (None if disabled), opening it on first use."""
+    global segment_cache_instance
+    if not SEGMENT_CACHE_DIR:
+        return None
+    with segment_cache_lock:
+        if segment_cache_instance is None:
+            segment_cache_instance = segment_cache.SegmentCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_MB * 1048576)
+        return segment_cache_instance
+
+network_scheduler_instance = None
+network_scheduler_lock = threading.Lock()
+
+def get_network_scheduler():
+    """Returns the network scheduler shared by all downloads of this process, created on first use."""
+    global network_scheduler_instance
+    with network_scheduler_lock:
+        if network_scheduler_instance is None:
+            network_scheduler_instance = scheduler.Scheduler(
+                MAX_CONNECTIONS_PER_HOST,
+                BANDWIDTH_LIMIT_MB * 1048576 if BANDWIDTH_LIMIT_MB else None,
+            )
+        return network_scheduler_instance
+
+metrics_sinks_instance = None
+metrics_sinks_lock = threading.Lock()
+
+def get_metrics_sinks():
+    """Returns the metrics sinks (JSON Lines and Prometheus files) shared by all jobs, created on first use."""
+    global metrics_sinks_instance
+    with metrics_sinks_lock:
+        if metrics_sinks_instance is None:
+            metrics_sinks_instance = []
+            if METRICS_JSONL_FILE:
+                metrics_sinks_instance.append(metrics.JsonLinesSink(METRICS_JSONL_FILE))
+            if METRICS_PROMETHEUS_FILE:
+                metrics_sinks_instance.append(metrics.PrometheusSink(METRICS_PROMETHEUS_FILE))
+        return metrics_sinks_instance
+
+archive_index_instance = None
+archive_index_lock = threading.Lock()
+
+def get_archive_index():
+    """Returns the archive index shared by all community syncs of this process, opening it on first use."""
+    global archive_index_instance
+    with archive_index_lock:
+        if archive_index_instance is None:
+            archive_index_instance = archive.ArchiveIndex(ARCHIVE_DB)
+        return archive_index_instance
+
+def sync_community(community_url, queue, output_dir, cookie_path, policy=None, status_callback=print):
+    """
+    Lists a community's VODs with the session of cookie_path and submits the new or changed ones to
+    queue (a jobs.JobQueue created with on_done=get_archive_index().record_download). Returns the job ids.
+    """
+    cookies = session_cookies(cookie_path, status_callback)
+    return archive.sync(community_url, get_archive_index(), queue, output_dir, cookie_path, cookies,
+                        policy=policy, status_callback=status_callback)
+
+live_recordings = set() # Eventos de parada das gravações ao vivo em andamento
+
+def download_hls_or_live(video_url, output_file, status_callback, concurrency, policy, cache=None, pipe=False,
+                         pool=None, clip=None):
+    """
+    Downloads an HLS VOD with the native engine; if the playlist turns out to be live,
+    records it with the live recorder until the stream ends or the user stops it.
+    """
+    try:
+        hls.download_hls(video_url, output_file, status_callback, concurrency=concurrency, pool=pool, policy=policy,
+                         cache=cache, pipe=pipe, clip=clip)
+    except hls.LivePlaylistError:
+        if clip:
+            raise ValueError("Recorte por tempo não é possível numa transmissão ao vivo.")
+        status_callback("Transmissão ao vivo detectada. Iniciando gravação...")
+        stop_event = threading.Event()
+        live_recordings.add(stop_event)
+        try:
+            live.record_live(video_url, output_file, status_callback, concurrency=concurrency, policy=policy,
+                             pool=pool, stop_event=stop_event, cache=cache)
+        finally:
+            live_recordings.discard(stop_event)
+
+_FFMPEG_PROGRESS_RE = re.compile(r'^(\w+)=(\S*)$')
+
+def download_video(video_url, output_file, status_callback, concurrency=HLS_CONCURRENCY, policy=None, pipe=None,
+                   clip=None):
+    """
+    Downloads the video. HLS (.m3u8) URLs go through the native parallel segment engine
+    (or the live recorder, for live playlists) and DASH (.mpd) URLs through the native DASH engine;
+    ffmpeg only remuxes the result. Anything else (or an unsupported manifest) is pulled by ffmpeg.
+    policy (a VariantPolicy, default: best quality) picks the HLS variant / DASH representation.
+    pipe (default: PIPE_TO_FFMPEG) streams HLS segments straight into ffmpeg instead of a partial file.
+    clip=(start, end) in seconds (end may be None) downloads only that time range, cut without re-encoding.
+    Provides status updates via the status_callback; pass a metrics.JobMetrics to also collect performance metrics.
+    Errors are reported through status_callback and re-raised.
+    """
+    status_callback = metrics.as_metrics(status_callback)
+    status_callback("Iniciando download do vídeo...")
+    print(f"Downloading video from: {video_url}")
+
+    if '.m3u8' in video_url or '.mpd' in video_url:
+        # Um pool por download: as conexões por servidor e a banda são divididas pelo agendador compartilhado
+        pool = HttpPool(max_idle_per_host=concurrency * 2, scheduler=get_network_scheduler(),
+                        bandwidth=JOB_BANDWIDTH_LIMIT_MB * 1048576 if JOB_BANDWIDTH_LIMIT_MB else None)
+        try:
+            if '.m3u8' in video_url:
+                download_hls_or_live(video_url, output_file, status_callback, concurrency, policy, get_segment_cache(),
+                                     PIPE_TO_FFMPEG if pipe is None else pipe, pool, clip)
+            else:
+                dash.download_dash(video_url, output_file, status_callback, concurrency=concurrency, pool=pool,
+                                   policy=policy, cache=get_segment_cache(), clip=clip)
+            status_callback(f"Download concluído. Arquivo salvo como {os.path.basename(output_file)}")
+            print(f"Download completed. File saved as {output_file}")
+            return
+        except (hls.UnsupportedPlaylistError, dash.UnsupportedManifestError) as e:
+            # Recursos não suportados pelo motor nativo (ex: criptografia): o ffmpeg baixa sozinho
+            print(f"Motor nativo indisponível para este manifesto ({e}). Usando ffmpeg.")
+        except metrics.JobCancelled:
+            raise
+        except subprocess.CalledProcessError as e:
+            error_msg = f"Erro no remux com ffmpeg. Verifique se o ffmpeg está no PATH. Erro: {e.output}"
+            status_callback(f"Erro no download: {error_msg}")
+            print(error_msg)
+            raise
+        except Exception as e:
+            error_msg = f"Um erro inesperado ocorreu durante o download: {e}"
+            status_callback(f"Erro no download: {error_msg}")
+            print(error_msg)
+            raise
+        finally:
+            pool.close()
+
+    # -progress escreve blocos chave=valor (tamanho, tempo, velocidade) em vez da linha de estatísticas;
+    # -reconnect faz o ffmpeg esperar e tentar de novo em 429/5xx em vez de falhar o trabalho inteiro
+    # Com recorte, -ss antes do -i faz o ffmpeg pular direto para o trecho (em HLS, só baixa os segmentos dele)
+    clip_input = f'-ss {clip[0] or 0:.3f} ' if clip else ''
+    clip_output = f'-t {clip[1] - (clip[0] or 0):.3f} ' if clip and clip[1] is not None else ''
+    command = f'ffmpeg -reconnect 1 -reconnect_on_network_error 1 -reconnect_on_http_error 429,5xx -reconnect_delay_max 30 {clip_input}-i "{video_url}" {clip_output}-c copy "{output_file}" -nostats -progress pipe:1 -loglevel warning -hide_banner -y'
+    
+    try:
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        
+        if process.stdout is None:
+            raise RuntimeError("Falha ao obter stdout do processo ffmpeg.")
+
+        progress = {}
+        with status_callback.stage('download'):
+            while True:
+                output = process.stdout.readline()
+                if output == '' and process.poll() is not None:
+                    break
+                if output:
+                    match = _FFMPEG_PROGRESS_RE.match(output.strip())
+                    if not match:
+                        print(output.strip())
+                        continue
+                    progress[match.group(1)] = match.group(2)
+                    if match.group(1) == 'progress':
+                        # Fim de um bloco de progresso
+                        size = int(progress['total_size']) if progress.get('total_size', '').isdigit() else 0
+                        out_time_us = int(progress['out_time_us']) if progress.get('out_time_us', '').isdigit() else 0
+                        status_callback.progress(out_time_us / 1e6, None, size)
+                        status_callback(f"Baixando: {progress.get('out_time', '')[:11]} ({size / 1048576:.1f} MB, {progress.get('speed', '?')})...")
+        
+        rc = process.poll()
+        if rc != 0:
+            raise subprocess.CalledProcessError(rc if rc is not None else -1, command, output=output)
+
+        status_callback(f"Download concluído. Arquivo salvo como {os.path.basename(output_file)}")
+        print(f"Download completed. File saved as {output_file}")
+
+    except metrics.JobCancelled:
+        process.kill()
+        raise
+    except subprocess.CalledProcessError as e:
+        error_msg = f"Erro no download com ffmpeg. Verifique se o ffmpeg está no PATH e se o URL é válido. Erro: {e.output}"
+        status_callback(f"Erro no download: {error_msg}")
+        print(error_msg)
+        raise
+    except Exception as e:
+        error_msg = f"Um erro inesperado ocorreu durante o download: {e}"
+        status_callback(f"Erro no download: {error_msg}")
+        print(error_msg)
+        raise
+
+def parse_timestamp(value):
+    """Converts '90', '1:30' or '01:02:03.5' to seconds. Raises ValueError for anything else."""
+    parts = value.strip().split(':')
+    if not 1 <= len(parts) <= 3 or not all(parts):
+        raise ValueError(f"Tempo inválido: {value!r}")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(f"Tempo inválido: {value!r}")
+    return seconds
+
+def clip_suffix(clip):
+    """File-name suffix of a clip (start, end), e.g. '_0h10m00s-0h12m00s'."""
+    def timestamp(seconds):
+        seconds = int(seconds)
+        return f"{seconds // 3600}h{seconds // 60 % 60:02d}m{seconds % 60:02d}s"
+    start, end = clip
+    return f"_{timestamp(start or 0)}-{timestamp(end) if end is not None else 'fim'}"
+
+def unique_output_file(path):
+    """path, or the first free 'name (2).mp4', 'name (3).mp4'... when a file already exists there."""
+    base, extension = os.path.splitext(path)
+    number = 1
+    while os.path.exists(path):
+        number += 1
+        path = f"{base} ({number}){extension}"
+    return path
+
+def clean_title(title):
+    """
+    Returns a filesystem-safe version of a page title.
+    Empty or generic Weverse titles become a timestamped default name.
+    """
+    title = title.strip()
+    if not title or "Weverse" in title:
+        return f"Weverse_VOD_{int(time.time())}"
+    return re.sub(r'[\\/:*?"<>|]', '', title)
+
+driver_pools = {} # Um pool por arquivo de cookies (None = navegadores sem login)
+driver_pools_lock = threading.Lock()
+last_cookie_path = None # Último arquivo de cookies escolhido, usado para buscar títulos
+
+def session_cookies(cookie_path, status_callback=print):
+    """
+    Returns the still-valid cookies of the shared session for cookie_path ([] without a cookie file),
+    warning through status_callback when the login has expired. Raises OSError/ValueError for unreadable files.
+    """
+    if not cookie_path:
+        return []
+    current = session.get_session(cookie_path)
+    if not current.is_valid():
+        status_callback("Atenção: a sessão dos cookies expirou. Faça login novamente e salve novos cookies.")
+    return current.valid_cookies()
+
+def reusable_cookie_path():
+    """The cookie file used last in this process, if its login is still valid (so the user isn't asked again)."""
+    if not last_cookie_path:
+        return None
+    try:
+        return last_cookie_path if session.get_session(last_cookie_path).is_valid() else None
+    except (OSError, ValueError):
+        return None
+
+def get_driver_pool(cookie_path):
+    """
+    Returns the pool of headless drivers authenticated with cookie_path,
+    creating and pre-warming it on first use.
+    """
+    with driver_pools_lock:
+        pool = driver_pools.get(cookie_path)
+        if pool is None:
+            def authenticate(driver):
+                # A sessão é lida uma vez e compartilhada por todos os navegadores do processo
+                if cookie_path:
+                    session.get_session(cookie_path).apply(driver)
+            pool = driver_pool.DriverPool(
+                size=DRIVER_POOL_SIZE, authenticate=authenticate,
+                max_pages=DRIVER_MAX_PAGES, max_heap_mb=DRIVER_MAX_HEAP_MB
+            )
+            pool.start()
+            driver_pools[cookie_path] = pool
+        return pool
+
+media_url_cache_instance = None
+media_url_cache_lock = threading.Lock()
+
+def get_media_url_cache():
+    """Returns the resolved media URL cache shared by this process, loading it on first use."""
+    global media_url_cache_instance
+    with media_url_cache_lock:
+        if media_url_cache_instance is None:
+            media_url_cache_instance = url_cache.MediaUrlCache(MEDIA_URL_CACHE_FILE)
+        return media_url_cache_instance
+
+def resolve_video(video_page_url, cookie_path, status_callback, browser=True):
+    """
+    Resolution stage: returns (title, video_url) for a VOD page; video_url is None when no direct link is found.
+    A media URL resolved earlier is reused while its signature is valid and it still answers;
+    otherwise the page is resolved again and the result cached. browser=False skips the Selenium fallback.
+    """
+    global last_cookie_path
+    last_cookie_path = cookie_path
+    status_callback = metrics.as_metrics(status_callback)
+    with status_callback.stage('resolution'):
+        cached = get_media_url_cache().get(video_page_url, validate=url_cache.url_is_alive)
+        if cached:
+            status_callback("URL do VOD reaproveitada do cache (sem abrir o navegador).")
+            print(f"Cached VOD link: {cached['video_url']}")
+            return cached['title'], cached['video_url']
+
+        title, video_url, thumbnail = find_video_details(video_page_url, cookie_path, status_callback, browser)
+        if video_url:
+            get_media_url_cache().put(video_page_url, video_url, title=title, thumbnail=thumbnail)
+        return title, video_url
+
+def find_video_details(video_page_url, cookie_path, status_callback, browser=True):
+    """
+    Finds (title, video_url, thumbnail URL or None) for a VOD page without consulting the cache.
+    First tries plain HTTP requests with the saved cookies; only if that fails (and browser is True) it leases
+    a headless Chrome already authenticated with the cookie file and scrapes the rendered page.
+    Browser errors propagate to the caller.
+    """
+    global last_cookie_path
+    last_cookie_path = cookie_path
+    status_callback = metrics.as_metrics(status_callback)
+
+    # Caminho rápido: sem navegador, só HTTP com os cookies salvos
+    status_callback("Buscando URL do VOD sem navegador...")
+    try:
+        with status_callback.stage('cookie_load'):
+            cookies = session_cookies(cookie_path, status_callback)
+        title, video_url, thumbnail = resolver.resolve_page(video_page_url, cookies)
+    except (OSError, ValueError) as e:
+        print(f"Resolução sem navegador indisponível: {e}")
+        title, video_url, thumbnail = '', None, None
+    if video_url:
+        status_callback(f"URL de VOD encontrada sem navegador: {video_url}")
+        return clean_title(title), video_url, thumbnail
+    if not browser:
+        return clean_title(title), None, thumbnail
+    status_callback("URL não encontrada sem navegador. Usando o Chrome...")
+
+    status_callback("Obtendo navegador autenticado do pool...")
+    lease_started = time.monotonic()
+    with get_driver_pool(cookie_path).lease() as driver:
+        status_callback.record_stage('driver_start', time.monotonic() - lease_started)
+        status_callback("Navegador iniciado. Carregando página do VOD...")
+        with status_callback.stage('page_load'):
+            driver.get(video_page_url)
+        print(f"Loading page: {video_page_url}")
+
+        # Sai assim que o primeiro manifesto aparece nas requisições, sem esperar o player nem varrer o log inteiro
+        media_logs = []
+        captured_url = capture_video_url_from_network(driver, status_callback, media_logs=media_logs)
+        thumbnail = thumbnail or resolver.find_thumbnail(driver.page_source)
+        if captured_url and ('.m3u8' in captured_url or '.mpd' in captured_url):
+            return clean_title(driver.title), captured_url, thumbnail
+
+        title = clean_title(driver.title)
+        # A página já teve a janela inteira da captura para carregar: não precisa esperar de novo pela tag <video>
+        video_url = extract_video_url_for_vods(driver, status_callback, logs=media_logs, dom_timeout=2) or captured_url
+        return title, video_url, thumbnail
+
+def probe_media(video_url, cookie_path=None):
+    """
+    Returns (duration in seconds or None, video variants) of an HLS or DASH manifest, reading only the manifests.
+    Live streams have no duration and direct files no variants; (None, None) means the manifest couldn't be read.
+    """
+    if '.m3u8' not in video_url and '.mpd' not in video_url:
+        return None, []
+    pool = None
+    try:
+        pool = HttpPool(cookies=session_cookies(cookie_path), scheduler=get_network_scheduler())
+        if '.mpd' in video_url:
+            text, final_url = pool.get_text(video_url)
+            representations = dash.parse_mpd(text, final_url)
+            variants = [{key: value for key, value in representation.items() if not key.startswith('_')}
+                        for representation in representations if representation['kind'] == 'video']
+            return (representations[0]['_duration'] or None) if representations else None, variants
+
+        variants = hls.load_variants(pool, video_url)
+        media_url = hls.select_variant(variants)['uri'] if variants else video_url
+        text, final_url = pool.get_text(media_url)
+        playlist = hls.parse_media_playlist(text, final_url)
+        duration = sum(segment.duration for segment in playlist.segments) if playlist.endlist else None
+        return duration, variants
+    except (HttpError, OSError, ValueError, hls.UnsupportedPlaylistError, dash.UnsupportedManifestError) as e:
+        print(f"Não foi possível ler o manifesto para os metadados: {e}")
+        return None, None
+    finally:
+        if pool:
+            pool.close()
+
+def fetch_metadata(video_page_url, cookie_path=None, status_callback=print):
+    """
+    Resolves a page's prefetch.VideoMetadata. Goes through resolve_video, so the media URL is cached for the
+    download stage, then reads the manifest for the duration and variants, which are cached alongside it.
+    Without a cookie_path only plain HTTP is tried: a browser without login can't see members-only VODs, and
+    the download would load the page again with the session anyway. Browser errors propagate to the caller.
+    """
+    title, video_url = resolve_video(video_page_url, cookie_path, status_callback, browser=bool(cookie_path))
+    entry = get_media_url_cache().get(video_page_url) or {}
+    duration, variants = entry.get('duration'), entry.get('variants')
+    if video_url and variants is None:
+        duration, variants = probe_media(video_url, cookie_path)
+        get_media_url_cache().update(video_page_url, duration=duration, variants=variants)
+    return prefetch.VideoMetadata(video_page_url, title, video_url, thumbnail=entry.get('thumbnail'),
+                                  duration=duration, variants=variants or [])
+
+metadata_prefetcher = None
+metadata_prefetcher_lock = threading.Lock()
+
+def prefetch_metadata(video_page_url):
+    """
+    Starts resolving a page's metadata in the background with the current session (see reusable_cookie_path),
+    and returns a Future of its prefetch.VideoMetadata. Repeated calls for the same page share the result.
+    """
+    global metadata_prefetcher
+    with metadata_prefetcher_lock:
+        if metadata_prefetcher is None:
+            metadata_prefetcher = prefetch.MetadataPrefetcher(
+                lambda page_url: fetch_metadata(page_url, reusable_cookie_path()), workers=PREFETCH_WORKERS
+            )
+        return metadata_prefetcher.request(video_page_url)
+
+def main(video_page_url, output_file=None, status_callback=print, cookie_path=None, policy=None,
+         concurrency=HLS_CONCURRENCY, pipe=None, clip=None):
+    """
+    Resolves and downloads one VOD page without any user interaction.
+    output_file may be a file path, a directory or None (the current directory); in the last two cases
+    the file is named after the page title. cookie_path is a cookie file written by save_cookies
+    (None = not logged in). clip=(start, end) in seconds downloads only that time range.
+    Returns the path of the saved video.
+    Raises VideoNotFoundError when no direct video URL is found; browser and download errors propagate.
+    """
+    job_metrics = metrics.JobMetrics(sinks=[metrics.StatusSink(status_callback)] + get_metrics_sinks())
+    job_metrics("Iniciando processo de download do VOD...")
+    error = None
+    try:
+        title, video_url = resolve_video(video_page_url, cookie_path, job_metrics)
+        if not video_url:
+            print("Could not find direct video URL for VOD.")
+            raise VideoNotFoundError("Não foi possível encontrar a URL direta do VOD. A estrutura da página pode ter mudado "
+                               "ou o vídeo usa um método de streaming não suportado.")
+        print(f"Direct VOD link found: {video_url}")
+
+        if not output_file or os.path.isdir(output_file):
+            # Títulos genéricos ou repetidos não podem sobrescrever um vídeo já salvo
+            output_file = unique_output_file(
+                os.path.join(output_file or '.', title + (clip_suffix(clip) if clip else '') + '.mp4'))
+        elif not output_file.lower().endswith('.mp4'):
+            output_file += '.mp4'
+
+        download_video(video_url, output_file, job_metrics, concurrency=concurrency, policy=policy, pipe=pipe,
+                       clip=clip)
+        job_metrics("Download do VOD concluído com sucesso!")
+        return output_file
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        job_metrics.finish(error)
+
+def close():
+    """Closes the pooled browsers, so no Chrome process is left behind."""
+    global metadata_prefetcher
+    with metadata_prefetcher_lock:
+        if metadata_prefetcher is not None:
+            metadata_prefetcher.close()
+            metadata_prefetcher = None
+    with driver_pools_lock:
+        for pool in driver_pools.values():
+            pool.close()
+        driver_pools.clear()
@@ -0,0 +1,297 @@
+"""
+Modo serviço: um processo de longa duração com uma pequena API HTTP/JSON local.
+
+Todos os trabalhos rodam na mesma fila persistente (core.JOBS_DB), com um único conjunto de
+workers, navegadores e sessões, então vários clientes podem enviar URLs sem que cada um abra
+o próprio Chrome.
+
+    python daemon.py --port 8765 -c weverse_cookies.json -o videos/ --quality 720p
+
+    POST   /jobs             {"url": "..."} ou {"urls": [...]}; output_dir, output_file e cookie_path opcionais
+    GET    /jobs[?state=...] lista os trabalhos
+    GET    /jobs/<id>        um trabalho
+    DELETE /jobs/<id>        cancela o trabalho
+    POST   /sync             {"community_url": "..."}; output_dir e cookie_path opcionais
+    GET    /events[?job=<id>] progresso e métricas em Server-Sent Events
+    GET    /metrics          totais no formato texto do Prometheus
+    GET    /health
+"""
+import argparse
+import json
+import queue
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import core
+import jobs
+from metrics import PrometheusSink
+
+DEFAULT_HOST = '127.0.0.1' # Só aceita conexões locais; a API não tem autenticação
+DEFAULT_PORT = 8765
+SSE_HEARTBEAT = 15 # Segundos entre comentários de keep-alive quando não há eventos
+SSE_QUEUE_SIZE = 1000 # Eventos guardados por cliente lento antes de começar a descartar
+MAX_BODY = 1024 * 1024
+
+_JOB_PATH_RE = re.compile(r'^/jobs/(\d+)$')
+
+
+class RequestError(Exception):
+    """An invalid API request; answered with `status` and a JSON error message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class EventBroker:
+    """
+    Metrics sink that fans every event out to the connected SSE clients.
+    Each client has a bounded queue: a client that doesn't keep up loses events instead of slowing the jobs.
+    """
+
+    def __init__(self, max_queued=SSE_QUEUE_SIZE):
+        self.max_queued = max_queued
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = queue.Queue(self.max_queued)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def emit(self, event, metrics):
+        data = event.to_dict()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(data)
+            except queue.Full:
+                pass
+
+    def job_finished(self, metrics):
+        pass
+
+
+class Service:
+    """The shared job queue, its defaults (output folder, cookie file, quality) and the event broker."""
+
+    def __init__(self, output_dir='.', cookie_path=None, policy=None, concurrency=core.HLS_CONCURRENCY):
+        self.output_dir = output_dir
+        self.cookie_path = cookie_path
+        self.policy = policy
+        self.concurrency = concurrency
+        self.broker = EventBroker()
+        self.prometheus = next((sink for sink in core.get_metrics_sinks() if isinstance(sink, PrometheusSink)), None)
+        self.stopping = threading.Event()
+        self.queue = jobs.JobQueue(
+            jobs.JobStore(core.JOBS_DB), core.resolve_video, self._download, print,
+            resolve_workers=core.RESOLVE_WORKERS, download_workers=core.DOWNLOAD_WORKERS,
+            metrics_sinks=core.get_metrics_sinks() + [self.broker], on_done=core.get_archive_index().record_download,
+        )
+
+    def _download(self, video_url, output_file, status_callback):
+        core.download_video(video_url, output_file, status_callback, concurrency=self.concurrency, policy=self.policy)
+
+    def start(self):
+        self.queue.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.queue.stop(timeout=5)
+        core.close()
+
+    def submit(self, body):
+        urls = body.get('urls') or ([body['url']] if body.get('url') else [])
+        if not isinstance(urls, list) or not urls:
+            raise RequestError(400, "Informe 'url' ou 'urls'.")
+        if not all(isinstance(url, str) and url.startswith(('http://', 'https://')) for url in urls):
+            raise RequestError(400, "URLs precisam começar com http:// ou https://.")
+        output_file = body.get('output_file')
+        if output_file and len(urls) > 1:
+            raise RequestError(400, "'output_file' só vale para uma URL; use 'output_dir' para várias.")
+        output_dir = body.get('output_dir') or self.output_dir
+        cookie_path = body.get('cookie_path') or self.cookie_path
+        return [self.queue.submit(url, output_dir=output_dir, output_file=output_file, cookie_path=cookie_path)
+                for url in urls]
+
+    def sync(self, body):
+        community_url = body.get('community_url')
+        if not isinstance(community_url, str) or not community_url.startswith(('http://', 'https://')):
+            raise RequestError(400, "Informe 'community_url'.")
+        try:
+            return core.sync_community(community_url, self.queue, body.get('output_dir') or self.output_dir,
+                                       body.get('cookie_path') or self.cookie_path, self.policy)
+        except (OSError, ValueError) as e:
+            raise RequestError(502, f"Falha ao listar a comunidade: {e}")
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = 'weverse-downloader'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        header = self.headers.get('Content-Length') or '0'
+        if not header.strip().isdigit():
+            raise RequestError(400, "Content-Length inválido.")
+        length = int(header)
+        if length > MAX_BODY:
+            raise RequestError(413, "Corpo da requisição grande demais.")
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise RequestError(400, "JSON inválido.")
+        if not isinstance(body, dict):
+            raise RequestError(400, "O corpo deve ser um objeto JSON.")
+        return body
+
+    def _job(self, path):
+        match = _JOB_PATH_RE.match(path)
+        if not match:
+            raise RequestError(404, "Recurso não encontrado.")
+        job_id = int(match.group(1))
+        job = self.service.queue.store.get(job_id)
+        if job is None:
+            raise RequestError(404, f"Trabalho {job_id} não existe.")
+        return job
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        try:
+            if method == 'GET' and url.path == '/health':
+                self._send_json(200, {'status': 'ok', 'jobs': self.service.queue.store.counts()})
+            elif method == 'GET' and url.path == '/jobs':
+                state = query.get('state', [None])[0]
+                self._send_json(200, self.service.queue.store.list(state))
+            elif method == 'POST' and url.path == '/jobs':
+                self._send_json(201, {'ids': self.service.submit(self._read_json())})
+            elif method == 'POST' and url.path == '/sync':
+                self._send_json(201, {'ids': self.service.sync(self._read_json())})
+            elif method == 'GET' and url.path == '/events':
+                self._stream_events(query.get('job', [None])[0])
+            elif method == 'GET' and url.path == '/metrics':
+                self._send_metrics()
+            elif method == 'GET':
+                self._send_json(200, self._job(url.path))
+            elif method == 'DELETE':
+                job = self._job(url.path)
+                if not self.service.queue.cancel(job['id']):
+                    raise RequestError(409, f"Trabalho {job['id']} já terminou ({job['state']}).")
+                self._send_json(202, self.service.queue.store.get(job['id']))
+            else:
+                raise RequestError(405, "Método não suportado.")
+        except RequestError as e:
+            self._send_json(e.status, {'error': str(e)})
+
+    def _send_metrics(self):
+        if self.service.prometheus is None:
+            raise RequestError(404, "Métricas do Prometheus desativadas (METRICS_PROMETHEUS_FILE).")
+        body = self.service.prometheus.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self, job_id):
+        job_name = f"job-{job_id}" if job_id else None
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        subscriber = self.service.broker.subscribe()
+        try:
+            while not self.service.stopping.is_set():
+                try:
+                    event = subscriber.get(timeout=SSE_HEARTBEAT)
+                except queue.Empty:
+                    self.wfile.write(b': keep-alive\n\n')
+                    self.wfile.flush()
+                    continue
+                if job_name and event['job'] != job_name:
+                    continue
+                data = json.dumps(event, ensure_ascii=False)
+                self.wfile.write(f"event: {event['kind']}\ndata: {data}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Cliente desconectou
+        finally:
+            self.service.broker.unsubscribe(subscriber)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Starts the job workers and serves the API until interrupted.
+    Raises jobs.StoreInUseError if another process is already running the job queue.
+    """
+    service.start()
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError:
+        service.stop()
+        raise
+    server.daemon_threads = True
+    server.service = service
+    print(f"Serviço ouvindo em http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Encerrando o serviço...")
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local com API HTTP/JSON para a fila de downloads do Weverse.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Endereço de escuta (padrão: só local).")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Porta de escuta.")
+    parser.add_argument('-o', '--output', default='.', help="Pasta padrão dos vídeos.")
+    parser.add_argument('-c', '--cookies', help="Arquivo de cookies padrão do Weverse.")
+    parser.add_argument('-q', '--quality', choices=list(core.QUALITY_PRESETS), default='best', help="Qualidade do vídeo.")
+    parser.add_argument('-j', '--concurrency', type=int, default=core.HLS_CONCURRENCY, help="Segmentos baixados em paralelo.")
+    args = parser.parse_args(argv)
+
+    service = Service(args.output, args.cookies, core.QUALITY_PRESETS[args.quality], args.concurrency)
+    try:
+        serve(service, args.host, args.port)
+    except jobs.StoreInUseError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Motor nativo de download MPEG-DASH (.mpd).
+
+Interpreta o manifesto (SegmentTemplate com ou sem SegmentTimeline, SegmentList e SegmentBase),
+escolhe uma representação de vídeo e uma de áudio pela mesma política usada no HLS e baixa
+as duas faixas ao mesmo tempo pelo pool de conexões. O ffmpeg só junta as faixas no .mp4 final.
+"""
+import math
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+
+from network import HttpPool
+from hls import (DEFAULT_CONCURRENCY, Segment, VariantPolicy, select_variant, download_tracks,
+                 select_time_range, clip_cut)
+from metrics import as_metrics
+
+SEGMENT_BASE_CHUNK = 4 * 1024 * 1024 # Tamanho das faixas de bytes usadas para paralelizar arquivos SegmentBase
+
+_NS = {'mpd': 'urn:mpeg:dash:schema:mpd:2011'}
+_DURATION_RE = re.compile(
+    r'P(?:(?P<days>\d+(?:\.\d+)?)D)?(?:T(?:(?P<hours>\d+(?:\.\d+)?)H)?(?:(?P<minutes>\d+(?:\.\d+)?)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?'
+)
+_TEMPLATE_RE = re.compile(r'\$(RepresentationID|Number|Time|Bandwidth)(%0(\d+)d)?\$')
+
+
+class UnsupportedManifestError(Exception):
+    """Raised when an MPD uses a feature the native engine can't handle (the caller should fall back to ffmpeg)."""
+
+
+def parse_duration(value):
+    """Converts an ISO 8601 duration (e.g. PT1H2M3.5S) to seconds."""
+    match = _DURATION_RE.fullmatch(value or '')
+    # 'P' e 'PT' casam com a expressão, mas uma duração precisa de ao menos um componente
+    if not match or not any(match.groupdict().values()):
+        raise ValueError(f"Duração inválida: {value!r}")
+    parts = {name: float(number) for name, number in match.groupdict().items() if number}
+    return (parts.get('days', 0) * 86400 + parts.get('hours', 0) * 3600
+            + parts.get('minutes', 0) * 60 + parts.get('seconds', 0))
+
+
+def _fill_template(template, representation_id, bandwidth, number=None, time=None):
+    def substitute(match):
+        name, width = match.group(1), match.group(3)
+        value = {'RepresentationID': representation_id, 'Number': number,
+                 'Time': time, 'Bandwidth': bandwidth}[name]
+        return str(value).zfill(int(width)) if width else str(value)
+    return _TEMPLATE_RE.sub(substitute, template).replace('$$', '$')
+
+
+def _parse_range(value):
+    start, _, end = value.partition('-')
+    return int(end) - int(start) + 1, int(start)
+
+
+def _base_url(element, parent_url):
+    base = element.find('mpd:BaseURL', _NS)
+    if base is not None and base.text:
+        return urljoin(parent_url, base.text.strip())
+    return parent_url
+
+
+def _merged(elements, tag):
+    """Merges the attributes of `tag` found on each element (outer first), so inner levels override outer ones."""
+    merged = None
+    children = []
+    for element in elements:
+        node = element.find(f'mpd:{tag}', _NS)
+        if node is not None:
+            merged = dict(merged or {}, **node.attrib)
+            children.append(node)
+    return merged, children
+
+
+def _template_segments(attributes, nodes, representation_id, bandwidth, base_url, period_duration):
+    timescale = int(attributes.get('timescale', 1))
+    start_number = int(attributes.get('startNumber', 1))
+    media = attributes['media']
+
+    init_section = None
+    if 'initialization' in attributes:
+        init_uri = _fill_template(attributes['initialization'], representation_id, bandwidth)
+        init_section = Segment(uri=urljoin(base_url, init_uri), duration=0.0, sequence=-1)
+
+    segments = []
+    timeline = None
+    for node in nodes:
+        found = node.find('mpd:SegmentTimeline', _NS)
+        if found is not None:
+            timeline = found
+
+    if timeline is not None:
+        number = start_number
+        time = 0
+        for s in timeline.findall('mpd:S', _NS):
+            time = int(s.get('t', time))
+            duration = int(s.get('d'))
+            repeat = int(s.get('r', 0))
+            if repeat < 0:
+                # r=-1: repete até o fim do período
+                repeat = math.ceil((period_duration * timescale - time) / duration) - 1
+            for _ in range(repeat + 1):
+                uri = _fill_template(media, representation_id, bandwidth, number=number, time=time)
+                segments.append(Segment(uri=urljoin(base_url, uri), duration=duration / timescale,
+                                        sequence=len(segments), init_section=init_section))
+                time += duration
+                number += 1
+        return segments
+
+    if 'duration' not in attributes:
+        raise UnsupportedManifestError("SegmentTemplate sem duration nem SegmentTimeline.")
+    segment_duration = int(attributes['duration']) / timescale
+    count = math.ceil(period_duration / segment_duration)
+    for i in range(count):
+        number = start_number + i
+        uri = _fill_template(media, representation_id, bandwidth, number=number,
+                             time=int(i * segment_duration * timescale))
+        segments.append(Segment(uri=urljoin(base_url, uri), duration=segment_duration,
+                                sequence=i, init_section=init_section))
+    return segments
+
+
+def _list_segments(node, base_url):
+    init_section = None
+    initialization = node.find('mpd:Initialization', _NS)
+    if initialization is not None:
+        init_range = _parse_range(initialization.get('range')) if initialization.get('range') else None
+        init_section = Segment(uri=urljoin(base_url, initialization.get('sourceURL', '')), duration=0.0,
+                               sequence=-1, byterange=init_range)
+    timescale = int(node.get('timescale', 1))
+    duration = int(node.get('duration', 0)) / timescale
+    segments = []
+    for segment_url in node.findall('mpd:SegmentURL', _NS):
+        byterange = _parse_range(segment_url.get('mediaRange')) if segment_url.get('mediaRange') else None
+        segments.append(Segment(uri=urljoin(base_url, segment_url.get('media', '')), duration=duration,
+                                sequence=len(segments), byterange=byterange, init_section=init_section))
+    return segments
+
+
+def _single_file_segments(pool, base_url, duration):
+    """SegmentBase / plain BaseURL: the whole track is one file, fetched as parallel byte ranges."""
+    status, headers, _, final_url = pool.request('HEAD', base_url)
+    size = int(headers.get('content-length', 0)) if status < 400 else 0
+    if not size:
+        return [Segment(uri=base_url, duration=duration, sequence=0)]
+    count = math.ceil(size / SEGMENT_BASE_CHUNK)
+    return [
+        Segment(uri=final_url, duration=duration / count, sequence=i,
+                byterange=(min(SEGMENT_BASE_CHUNK, size - i * SEGMENT_BASE_CHUNK), i * SEGMENT_BASE_CHUNK))
+        for i in range(count)
+    ]
+
+
+def parse_mpd(text, mpd_url):
+    """
+    Parses a static MPD and returns its representations as variant dicts
+    ('kind' video/audio, 'id', 'bandwidth', 'resolution', 'codecs') plus the
+    internal fields needed by representation_segments().
+    """
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError as e:
+        raise UnsupportedManifestError(f"MPD inválido: {e}")
+    if root.get('type', 'static') != 'static':
+        raise UnsupportedManifestError("MPD dinâmico (transmissão ao vivo).")
+    periods = root.findall('mpd:Period', _NS)
+    if len(periods) != 1:
+        raise UnsupportedManifestError(f"MPD com {len(periods)} períodos.")
+    period = periods[0]
+
+    duration_text = period.get('duration') or root.get('mediaPresentationDuration')
+    period_duration = parse_duration(duration_text) if duration_text else 0.0
+    period_url = _base_url(period, _base_url(root, mpd_url))
+
+    representations = []
+    for adaptation in period.findall('mpd:AdaptationSet', _NS):
+        if adaptation.find('mpd:ContentProtection', _NS) is not None:
+            raise UnsupportedManifestError("Conteúdo protegido por DRM (ContentProtection).")
+        adaptation_url = _base_url(adaptation, period_url)
+        for representation in adaptation.findall('mpd:Representation', _NS):
+            mime = representation.get('mimeType') or adaptation.get('mimeType') or ''
+            content_type = adaptation.get('contentType') or mime.split('/')[0]
+            if content_type not in ('video', 'audio'):
+                continue
+            width = representation.get('width') or adaptation.get('width')
+            height = representation.get('height') or adaptation.get('height')
+            representations.append({
+                'kind': content_type,
+                'id': representation.get('id'),
+                'bandwidth': int(representation.get('bandwidth', 0)),
+                'resolution': (int(width), int(height)) if width and height else None,
+                'codecs': representation.get('codecs') or adaptation.get('codecs'),
+                '_levels': (period, adaptation, representation),
+                '_base_url': _base_url(representation, adaptation_url),
+                '_duration': period_duration,
+            })
+    return representations
+
+
+def representation_segments(pool, representation):
+    """
+    Builds the list of segments (with init section) of one representation. Returns (segments, single_file):
+    single_file is True for SegmentBase or a bare BaseURL, whose segments are byte ranges of one file rather
+    than time slices, so their durations can't be used to select a time range.
+    """
+    levels = representation['_levels']
+    base_url = representation['_base_url']
+    template, template_nodes = _merged(levels, 'SegmentTemplate')
+    if template is not None:
+        return _template_segments(template, template_nodes, representation['id'], representation['bandwidth'],
+                                  base_url, representation['_duration']), False
+    for level in reversed(levels):
+        segment_list = level.find('mpd:SegmentList', _NS)
+        if segment_list is not None:
+            return _list_segments(segment_list, base_url), False
+    # SegmentBase (ou só BaseURL): arquivo único com índice interno
+    return _single_file_segments(pool, base_url, representation['_duration']), True
+
+
+def download_dash(mpd_url, output_file, status_callback, concurrency=DEFAULT_CONCURRENCY, pool=None, policy=None,
+                  cache=None, clip=None):
+    """
+    Downloads a static DASH presentation: the video and audio representations chosen by
+    `policy` are fetched concurrently over one connection pool, each journaled for resuming,
+    and then muxed once into output_file. Segments found in `cache` aren't downloaded again.
+    Raises UnsupportedManifestError for dynamic, multi-period or DRM-protected manifests.
+    With clip=(start, end) in seconds, each track only downloads the segments of its timeline that overlap
+    the range, and the tracks are cut to it without re-encoding.
+    """
+    own_pool = pool is None
+    pool = pool or HttpPool(max_idle_per_host=concurrency * 2)
+    policy = policy or VariantPolicy()
+    metrics = as_metrics(status_callback)
+    try:
+        metrics("Lendo manifesto DASH...")
+        text, final_url = pool.get_text(mpd_url)
+        representations = parse_mpd(text, final_url)
+
+        video = select_variant([r for r in representations if r['kind'] == 'video'], policy)
+        audio = select_variant([r for r in representations if r['kind'] == 'audio'], VariantPolicy(quality=policy.quality))
+        tracks = [(kind, r) for kind, r in (('video', video), ('audio', audio)) if r is not None]
+        if not tracks:
+            raise UnsupportedManifestError("MPD sem representações de vídeo ou áudio.")
+
+        selected, offsets = [], []
+        for kind, representation in tracks:
+            segments, single_file = representation_segments(pool, representation)
+            offset = 0.0
+            # Num arquivo único (SegmentBase), as faixas de bytes não correspondem a tempos: baixa a faixa inteira
+            if clip and not single_file:
+                segments, offset = select_time_range(segments, *clip)
+            selected.append((kind, segments))
+            offsets.append(offset)
+        download_tracks(pool, selected, output_file, metrics, concurrency, cache=cache,
+                        cut=clip_cut(clip, offsets) if clip else None)
+    finally:
+        if own_pool:
+            pool.close()
@@ -0,0 +1,232 @@
+"""
+Pool de navegadores Chrome headless pré-aquecidos e já autenticados.
+
+Abrir o Chrome domina o tempo até o primeiro byte em VODs curtos, então os drivers
+ficam abertos entre trabalhos. Cada uso "empresta" um driver do pool; drivers que
+não respondem, que já abriram páginas demais ou que passaram do limite de memória
+são fechados e substituídos em segundo plano.
+
+Selenium e webdriver_manager só são importados quando o primeiro navegador é criado, e o caminho
+do chromedriver fica salvo em disco para que a inicialização não precise consultar a rede.
+"""
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_PAGES = 50 # Páginas abertas antes de reciclar o driver
+DEFAULT_MAX_HEAP_MB = 512 # Heap JavaScript máximo antes de reciclar o driver
+DRIVER_PATH_CACHE_FILE = "weverse_chromedriver.json" # Caminho do chromedriver resolvido pelo webdriver_manager
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _read_cached_driver_path():
+    try:
+        with open(DRIVER_PATH_CACHE_FILE, 'r', encoding='utf-8') as f:
+            path = json.load(f).get('path')
+    except (OSError, ValueError, AttributeError):
+        return None
+    return path if path and os.path.isfile(path) else None
+
+
+def _write_cached_driver_path(path):
+    try:
+        with open(DRIVER_PATH_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'path': path}, f)
+    except OSError as e:
+        print(f"Não foi possível salvar o caminho do chromedriver: {e}")
+
+
+def chromedriver_path(refresh=False):
+    """
+    Returns the chromedriver path: from memory, then from DRIVER_PATH_CACHE_FILE, and only if
+    neither has a usable path (or refresh is True) from webdriver_manager, which may hit the network.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if refresh:
+            _driver_path = None
+        elif _driver_path is None:
+            _driver_path = _read_cached_driver_path()
+        if _driver_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _driver_path = ChromeDriverManager().install()
+            _write_cached_driver_path(_driver_path)
+        return _driver_path
+
+
+def create_driver(headless=True):
+    """Starts a Chrome instance with performance logging enabled (needed by extract_video_url_for_vods)."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import SessionNotCreatedException
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--log-level=3')
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    # Só eventos de rede vão para o log de desempenho; eventos de página/timeline não são bufferizados
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+    try:
+        driver = webdriver.Chrome(service=ChromeService(chromedriver_path()), options=chrome_options)
+    except SessionNotCreatedException:
+        # O Chrome foi atualizado e o chromedriver salvo não é mais compatível: resolve de novo
+        driver = webdriver.Chrome(service=ChromeService(chromedriver_path(refresh=True)), options=chrome_options)
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+    except Exception:
+        pass
+    return driver
+
+
+def js_heap_mb(driver):
+    """Returns the JavaScript heap used by the current page in MB, or None if Chrome doesn't report it."""
+    try:
+        metrics = driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+    except Exception:
+        return None
+    for metric in metrics:
+        if metric['name'] == 'JSHeapUsedSize':
+            return metric['value'] / 1048576
+    return None
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class DriverPool:
+    """
+    Keeps up to `size` long-lived Chrome drivers.
+
+    authenticate(driver), if given, is called once on every new driver (e.g. to load the
+    Weverse cookies) so leased drivers are already logged in.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, authenticate=None, max_pages=DEFAULT_MAX_PAGES,
+                 max_heap_mb=DEFAULT_MAX_HEAP_MB, headless=True, factory=None):
+        self.size = size
+        self.authenticate = authenticate
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.factory = factory or (lambda: create_driver(headless))
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._count = 0
+        self._closed = False
+
+    def start(self):
+        """Pre-warms the pool by launching every driver in the background."""
+        for _ in range(self.size):
+            threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _warm_one(self):
+        with self._lock:
+            if self._closed or self._count >= self.size:
+                return
+            self._count += 1
+        try:
+            self._idle.put(self._create())
+        except Exception as e:
+            with self._lock:
+                self._count -= 1
+            print(f"Erro ao pré-aquecer o navegador: {e}")
+
+    def _create(self):
+        driver = self.factory()
+        try:
+            if self.authenticate:
+                self.authenticate(driver)
+        except Exception:
+            driver.quit()
+            raise
+        return _PooledDriver(driver)
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._count -= 1
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _healthy(self, pooled):
+        try:
+            pooled.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, pooled):
+        if pooled.pages >= self.max_pages:
+            return True
+        heap = js_heap_mb(pooled.driver)
+        return heap is not None and heap > self.max_heap_mb
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Pool de navegadores fechado.")
+                create = self._count < self.size and self._idle.empty()
+                if create:
+                    self._count += 1
+            if create:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._lock:
+                        self._count -= 1
+                    raise
+            try:
+                pooled = self._idle.get(timeout=1)
+            except queue.Empty:
+                # Um driver pode ter sido descartado enquanto esperávamos; verifica de novo se dá para criar outro
+                continue
+            if self._healthy(pooled):
+                return pooled
+            print("Navegador do pool não respondeu; substituindo.")
+            self._discard(pooled)
+
+    @contextmanager
+    def lease(self):
+        """Lends a driver for one lookup and takes it back (or recycles it) afterwards."""
+        pooled = self._checkout()
+        try:
+            # Descarta logs de desempenho de páginas anteriores para não confundir a extração da URL
+            pooled.driver.get_log('performance')
+        except Exception:
+            pass
+        broken = False
+        try:
+            yield pooled.driver
+        except Exception:
+            broken = not self._healthy(pooled)
+            raise
+        finally:
+            pooled.pages += 1
+            if broken or self._closed or self._needs_recycle(pooled):
+                self._discard(pooled)
+                if not self._closed:
+                    threading.Thread(target=self._warm_one, daemon=True).start()
+            else:
+                self._idle.put(pooled)
+
+    def close(self):
+        """Quits every idle driver; drivers currently leased are quit when returned."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
@@ -0,0 +1,601 @@
+"""
+Motor nativo de download HLS.
+
+Lê a playlist de mídia, baixa os segmentos em paralelo por um pool de conexões HTTP
+e grava tudo em ordem num arquivo intermediário. O ffmpeg só faz o remux final para .mp4.
+"""
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+
+from network import HttpPool, HttpError
+from scheduler import RETRYABLE_STATUS, parse_retry_after, retry_delay
+from mux import remux, MuxPipe
+from journal import SegmentJournal
+from metrics import as_metrics
+
+DEFAULT_CONCURRENCY = 8
+SEGMENT_RETRIES = 3
+
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class UnsupportedPlaylistError(Exception):
+    """Raised when a playlist uses a feature the native engine can't handle (the caller should fall back to ffmpeg)."""
+
+
+class LivePlaylistError(UnsupportedPlaylistError):
+    """Raised by download_hls for a playlist without EXT-X-ENDLIST (a live stream, see live.record_live)."""
+
+
+@dataclass
+class Segment:
+    uri: str
+    duration: float
+    sequence: int
+    byterange: Optional[tuple] = None  # (length, offset)
+    discontinuity: bool = False
+    init_section: Optional["Segment"] = None  # EXT-X-MAP ativo para este segmento (fMP4)
+
+
+@dataclass
+class VariantPolicy:
+    """
+    How to pick a variant from a master playlist (or a DASH representation).
+    quality is 'best' or 'worst'; max_height / max_bandwidth cap the candidates.
+    min_height picks the smallest variant at least that tall instead (the largest if none is).
+    If no variant fits the caps, the smallest one is used.
+    """
+    quality: str = 'best'
+    max_height: Optional[int] = None
+    max_bandwidth: Optional[int] = None
+    min_height: Optional[int] = None
+
+
+@dataclass
+class MediaPlaylist:
+    segments: list
+    target_duration: float
+    media_sequence: int
+    endlist: bool
+    encrypted: bool
+    discontinuity_sequence: int = 0
+
+
+def parse_attributes(value):
+    """Parses an HLS attribute list (KEY=VALUE,KEY="VALUE") into a dict."""
+    attributes = {}
+    for key, raw in _ATTRIBUTE_RE.findall(value):
+        if raw.startswith('"') and raw.endswith('"'):
+            raw = raw[1:-1]
+        attributes[key] = raw
+    return attributes
+
+
+def _parse_byterange(value, default_offset):
+    length, _, offset = value.partition('@')
+    return int(length), int(offset) if offset else default_offset
+
+
+def is_master_playlist(text):
+    return '#EXT-X-STREAM-INF' in text
+
+
+def parse_master_playlist(text, base_url):
+    """
+    Returns the variant streams of a master playlist as dicts with
+    'uri', 'bandwidth', 'resolution' (width, height) or None, 'codecs' and 'audio' (the AUDIO group id or None).
+    """
+    variants = []
+    pending = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            pending = parse_attributes(line.split(':', 1)[1])
+        elif line and not line.startswith('#') and pending is not None:
+            resolution = None
+            if 'RESOLUTION' in pending:
+                width, _, height = pending['RESOLUTION'].partition('x')
+                resolution = (int(width), int(height))
+            variants.append({
+                'uri': urljoin(base_url, line),
+                'bandwidth': int(pending.get('BANDWIDTH', 0)),
+                'resolution': resolution,
+                'codecs': pending.get('CODECS'),
+                'audio': pending.get('AUDIO'),
+            })
+            pending = None
+    return variants
+
+
+def parse_audio_renditions(text, base_url):
+    """
+    Returns the alternate audio renditions (EXT-X-MEDIA:TYPE=AUDIO) of a master playlist, grouped by GROUP-ID,
+    as dicts with 'uri', 'name', 'language', 'default' and 'bandwidth'. Renditions without a URI are left out:
+    their audio is muxed into the variant stream itself. The DEFAULT rendition comes first in each group.
+    """
+    groups = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith('#EXT-X-MEDIA:'):
+            continue
+        attributes = parse_attributes(line.split(':', 1)[1])
+        if attributes.get('TYPE') != 'AUDIO' or not attributes.get('URI'):
+            continue
+        groups.setdefault(attributes.get('GROUP-ID'), []).append({
+            'uri': urljoin(base_url, attributes['URI']),
+            'name': attributes.get('NAME'),
+            'language': attributes.get('LANGUAGE'),
+            'default': attributes.get('DEFAULT') == 'YES',
+            'bandwidth': int(attributes.get('BANDWIDTH', 0)),
+            'resolution': None,
+        })
+    for renditions in groups.values():
+        # sort() é estável: entre renditions equivalentes, select_variant fica com a DEFAULT
+        renditions.sort(key=lambda rendition: not rendition['default'])
+    return groups
+
+
+def _is_audio_only(variant):
+    codecs = variant.get('codecs') or ''
+    return variant.get('resolution') is None and bool(codecs) and all(
+        codec.strip().startswith(('mp4a', 'ac-3', 'ec-3', 'opus')) for codec in codecs.split(',')
+    )
+
+
+def select_variant(variants, policy=None):
+    """
+    Picks one variant dict ('bandwidth', 'resolution', 'codecs') according to a VariantPolicy.
+    Audio-only variants are only chosen when there is nothing else.
+    """
+    policy = policy or VariantPolicy()
+    if not variants:
+        return None
+    candidates = [v for v in variants if not _is_audio_only(v)] or list(variants)
+
+    def sort_key(variant):
+        height = variant['resolution'][1] if variant.get('resolution') else 0
+        return height, variant.get('bandwidth', 0)
+
+    allowed = [
+        v for v in candidates
+        if (policy.max_height is None or v.get('resolution') is None or v['resolution'][1] <= policy.max_height)
+        and (policy.max_bandwidth is None or v.get('bandwidth', 0) <= policy.max_bandwidth)
+    ]
+    if not allowed:
+        # Nenhuma variante cabe nos limites: usa a menor disponível
+        return min(candidates, key=sort_key)
+    if policy.min_height is not None:
+        tall_enough = [v for v in allowed if sort_key(v)[0] >= policy.min_height]
+        # Nenhuma variante chega à altura mínima: usa a maior permitida
+        return min(tall_enough, key=sort_key) if tall_enough else max(allowed, key=sort_key)
+    if policy.quality == 'worst':
+        return min(allowed, key=sort_key)
+    return max(allowed, key=sort_key)
+
+
+def parse_media_playlist(text, base_url):
+    """Parses a media playlist into a MediaPlaylist with absolute segment URLs."""
+    if not text.lstrip().startswith('#EXTM3U'):
+        raise ValueError("Conteúdo não é uma playlist M3U8 válida.")
+
+    segments = []
+    target_duration = 0.0
+    media_sequence = 0
+    discontinuity_sequence = 0
+    endlist = False
+    encrypted = False
+
+    duration = None
+    byterange = None
+    discontinuity = False
+    init_section = None
+    # Offset implícito do próximo EXT-X-BYTERANGE sem '@', por URI
+    next_offsets = {}
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            target_duration = float(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-DISCONTINUITY-SEQUENCE:'):
+            discontinuity_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',', 1)[0])
+        elif line.startswith('#EXT-X-BYTERANGE:'):
+            byterange = line.split(':', 1)[1]
+        elif line.startswith('#EXT-X-DISCONTINUITY') and not line.startswith('#EXT-X-DISCONTINUITY-SEQUENCE'):
+            discontinuity = True
+        elif line.startswith('#EXT-X-ENDLIST'):
+            endlist = True
+        elif line.startswith('#EXT-X-KEY:'):
+            method = parse_attributes(line.split(':', 1)[1]).get('METHOD', 'NONE')
+            if method != 'NONE':
+                encrypted = True
+        elif line.startswith('#EXT-X-MAP:'):
+            attributes = parse_attributes(line.split(':', 1)[1])
+            map_uri = urljoin(base_url, attributes['URI'])
+            map_range = None
+            if 'BYTERANGE' in attributes:
+                map_range = _parse_byterange(attributes['BYTERANGE'], 0)
+            init_section = Segment(uri=map_uri, duration=0.0, sequence=-1, byterange=map_range)
+        elif not line.startswith('#'):
+            uri = urljoin(base_url, line)
+            segment_range = None
+            if byterange is not None:
+                segment_range = _parse_byterange(byterange, next_offsets.get(uri, 0))
+                next_offsets[uri] = segment_range[1] + segment_range[0]
+            segments.append(Segment(
+                uri=uri,
+                duration=duration or 0.0,
+                sequence=media_sequence + len(segments),
+                byterange=segment_range,
+                discontinuity=discontinuity,
+                init_section=init_section,
+            ))
+            duration = None
+            byterange = None
+            discontinuity = False
+
+    return MediaPlaylist(segments, target_duration, media_sequence, endlist, encrypted, discontinuity_sequence)
+
+
+def select_time_range(segments, start=None, end=None):
+    """
+    Maps a time range (seconds; end=None means until the end) onto segment boundaries using the segment
+    durations (EXTINF or the DASH timeline). Returns (segments overlapping the range, time where the first begins).
+    Raises ValueError when no segment overlaps the range.
+    """
+    start = start or 0.0
+    position = 0.0
+    selected = []
+    offset = None
+    for segment in segments:
+        segment_end = position + segment.duration
+        if segment_end > start and (end is None or position < end):
+            if offset is None:
+                offset = position
+            selected.append(segment)
+        position = segment_end
+    if not selected:
+        raise ValueError(f"O intervalo pedido ({start:.0f}s a {end if end is not None else 'fim'}) "
+                         f"está fora do vídeo ({position:.0f}s).")
+    return selected, offset
+
+
+def clip_cut(clip, offsets):
+    """
+    For a clip (start, end) whose tracks were downloaded from the given segment start times,
+    returns (seconds to skip in each track, duration to keep), as expected by mux.remux.
+    """
+    start, end = clip
+    start = start or 0.0
+    starts = [max(0.0, start - offset) for offset in offsets]
+    duration = end - start if end is not None else None
+    return starts, duration
+
+
+def load_variants(pool, playlist_url):
+    """Returns the variants of a master playlist, or an empty list if playlist_url is already a media playlist."""
+    text, final_url = pool.get_text(playlist_url)
+    return parse_master_playlist(text, final_url) if is_master_playlist(text) else []
+
+
+def _load_variant(pool, playlist_url, policy):
+    # Devolve (MediaPlaylist, URL, rendition de áudio separada ou None) da variante escolhida por `policy`
+    text, final_url = pool.get_text(playlist_url)
+    audio = None
+    if is_master_playlist(text):
+        variant = select_variant(parse_master_playlist(text, final_url), policy)
+        if variant is None:
+            raise UnsupportedPlaylistError("Playlist master sem variantes.")
+        resolution = 'x'.join(map(str, variant['resolution'])) if variant['resolution'] else '?'
+        print(f"Variante escolhida: {resolution}, {variant['bandwidth']} bps")
+        renditions = parse_audio_renditions(text, final_url).get(variant['audio'])
+        # Mesma regra do motor DASH para a faixa de áudio: só a preferência melhor/pior da política vale
+        audio = select_variant(renditions, VariantPolicy(quality=(policy or VariantPolicy()).quality))
+        if audio is not None and audio['uri'] == variant['uri']:
+            audio = None
+        text, final_url = pool.get_text(variant['uri'])
+    return parse_media_playlist(text, final_url), final_url, audio
+
+
+def load_media_playlist(pool, playlist_url, policy=None):
+    """
+    Fetches playlist_url; if it is a master playlist, picks a variant with select_variant and fetches that.
+    Returns (MediaPlaylist, media_playlist_url). Use load_media_playlists to also get separate audio.
+    """
+    playlist, media_url, _ = _load_variant(pool, playlist_url, policy)
+    return playlist, media_url
+
+
+def load_media_playlists(pool, playlist_url, policy=None):
+    """
+    Like load_media_playlist, but when the chosen variant takes its audio from an EXT-X-MEDIA group,
+    that group's rendition is fetched too. Returns [(kind, MediaPlaylist, media_playlist_url)], video first.
+    """
+    playlist, media_url, audio = _load_variant(pool, playlist_url, policy)
+    tracks = [('video', playlist, media_url)]
+    if audio is not None:
+        print(f"Áudio separado escolhido: {audio['name'] or audio['language'] or audio['uri']}")
+        text, final_url = pool.get_text(audio['uri'])
+        tracks.append(('audio', parse_media_playlist(text, final_url), final_url))
+    return tracks
+
+
+def _part_extension(segments):
+    # Áudio empacotado (ADTS, AC-3, MP3) mantém a extensão do segmento para o ffmpeg reconhecer o formato
+    extension = os.path.splitext(urlsplit(segments[0].uri).path)[1].lower()
+    # fMP4: com EXT-X-MAP, ou arquivo único do DASH (SegmentBase) baixado por faixas de bytes
+    if any(s.init_section for s in segments) or extension in ('.mp4', '.m4s', '.m4v', '.m4a'):
+        return '.part.mp4'
+    return '.part' + extension if extension in ('.aac', '.ac3', '.ec3', '.mp3') else '.part.ts'
+
+
+def fetch_segment(pool, segment, retries=SEGMENT_RETRIES, metrics=None, cache=None):
+    """
+    Downloads one segment (honouring its byte range), retrying transient failures and throttling
+    responses with jittered exponential backoff (never sooner than the server's Retry-After).
+    If `metrics` (a JobMetrics) is given, the segment's size and latency and every retry are reported to it.
+    With a `cache` (a segment_cache.SegmentCache) the segment is served from disk when already stored,
+    and stored after being downloaded.
+    """
+    if cache:
+        data = cache.get(segment.uri, segment.byterange)
+        if data is not None:
+            return data
+
+    headers = None
+    if segment.byterange:
+        length, offset = segment.byterange
+        headers = {'Range': f'bytes={offset}-{offset + length - 1}'}
+
+    for attempt in range(retries + 1):
+        start = time.monotonic()
+        try:
+            status, response_headers, body, final_url = pool.request('GET', segment.uri, headers)
+            if status >= 400:
+                raise HttpError(status, final_url, response_headers)
+            if segment.byterange and status == 200:
+                # Servidor ignorou o Range e devolveu o arquivo inteiro
+                length, offset = segment.byterange
+                body = body[offset:offset + length]
+            if metrics:
+                metrics.segment(len(body), time.monotonic() - start)
+            if cache:
+                cache.put(segment.uri, body, segment.byterange)
+            return body
+        except HttpError as e:
+            if e.status not in RETRYABLE_STATUS or attempt == retries:
+                raise
+            error = e
+            retry_after = parse_retry_after(e.headers.get('retry-after'))
+        except OSError as e:
+            if attempt == retries:
+                raise
+            error = e
+            retry_after = None
+        if metrics:
+            metrics.retry(error)
+        time.sleep(retry_delay(attempt, retry_after))
+
+
+def iter_segment_data(pool, segments, concurrency=DEFAULT_CONCURRENCY, window=None, metrics=None, cache=None):
+    """
+    Yields (segment, data) in playlist order while fetching up to `concurrency` segments in parallel.
+    At most `window` segments (default 2x concurrency) are in flight or waiting in the reorder buffer,
+    so memory stays bounded no matter how long the playlist is.
+    """
+    window = window or concurrency * 2
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+        next_submit = 0
+        try:
+            for index, segment in enumerate(segments):
+                while next_submit < len(segments) and next_submit < index + window:
+                    pending[next_submit] = executor.submit(fetch_segment, pool, segments[next_submit],
+                                                            metrics=metrics, cache=cache)
+                    next_submit += 1
+                yield segment, pending.pop(index).result()
+        finally:
+            for future in pending.values():
+                future.cancel()
+
+
+def download_segments(pool, segments, part_file, journal, source_url, status_callback,
+                      concurrency=DEFAULT_CONCURRENCY, description="Baixando", cache=None):
+    """
+    Appends `segments` to part_file in order (with their init sections), fetching them in parallel.
+    Segments already recorded in `journal` and still intact in part_file are skipped;
+    the others are looked up in `cache` (if given) before going to the network.
+    """
+    metrics = as_metrics(status_callback)
+    total = len(segments)
+    done = journal.resume(source_url, part_file, total)
+    if done:
+        metrics(f"Retomando download: {done}/{total} segmentos já baixados e verificados.")
+    print(f"{description}: {total - done} de {total} segmentos a baixar de {source_url} ({concurrency} conexões)")
+
+    written = journal.offset
+    # O init (EXT-X-MAP) já gravado é o do último segmento verificado
+    current_init = segments[done - 1].init_section if done else None
+    with metrics.stage('download'), open(part_file, 'ab') as f:
+        segment_data = iter_segment_data(pool, segments[done:], concurrency, metrics=metrics, cache=cache)
+        for index, (segment, data) in enumerate(segment_data, start=done):
+            chunks = [data]
+            if segment.init_section is not None and segment.init_section != current_init:
+                chunks.insert(0, fetch_segment(pool, segment.init_section, metrics=metrics, cache=cache))
+                current_init = segment.init_section
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            journal.record(index, *chunks)
+            metrics.progress(index + 1, total, written)
+            metrics(f"{description}: segmento {index + 1}/{total} ({written / 1048576:.1f} MB, "
+                    f"{metrics.throughput() / 1048576:.1f} MB/s)...")
+
+
+def stream_segments(pool, segments, mux_pipe, status_callback, concurrency=DEFAULT_CONCURRENCY,
+                    description="Baixando"):
+    """
+    Feeds `segments` in order straight into a mux.MuxPipe, fetching them in parallel.
+    Memory stays bounded by iter_segment_data's window (2x concurrency segments), however long the VOD is.
+    Nothing goes through the segment cache, so the only copy on disk is the final file.
+    """
+    metrics = as_metrics(status_callback)
+    total = len(segments)
+    print(f"{description}: {total} segmentos direto para o ffmpeg ({concurrency} conexões)")
+    written = 0
+    current_init = None
+    with metrics.stage('download'):
+        for index, (segment, data) in enumerate(iter_segment_data(pool, segments, concurrency, metrics=metrics)):
+            if segment.init_section is not None and segment.init_section != current_init:
+                init_data = fetch_segment(pool, segment.init_section, metrics=metrics)
+                mux_pipe.write(init_data)
+                written += len(init_data)
+                current_init = segment.init_section
+            mux_pipe.write(data)
+            written += len(data)
+            metrics.progress(index + 1, total, written)
+            metrics(f"{description}: segmento {index + 1}/{total} ({written / 1048576:.1f} MB, "
+                    f"{metrics.throughput() / 1048576:.1f} MB/s)...")
+
+
+def download_hls(playlist_url, output_file, status_callback, concurrency=DEFAULT_CONCURRENCY, pool=None, policy=None,
+                 cache=None, pipe=False, clip=None):
+    """
+    Downloads an HLS VOD with the native parallel engine and remuxes it into output_file.
+    For a master playlist the variant is chosen by `policy` (a VariantPolicy; default: best quality); when the
+    variant's audio is a separate EXT-X-MEDIA rendition, it is downloaded as a second track and muxed in.
+    Progress is journaled next to output_file, so an interrupted download resumes with only the missing segments.
+    Raises LivePlaylistError for live playlists and UnsupportedPlaylistError for encrypted ones,
+    so the caller can switch to the live recorder or fall back to ffmpeg.
+    status_callback may be a metrics.JobMetrics to also collect stage timings, bytes and segment latencies.
+    Segments found in `cache` (a segment_cache.SegmentCache) aren't downloaded again.
+    With pipe=True, single-track MPEG-TS VODs are streamed into ffmpeg's stdin instead of a partial file, bypassing
+    `cache`, so every byte is written to disk once; the trade-off is that an interrupted download can't be resumed.
+    With clip=(start, end) in seconds (end may be None), only the segments overlapping that range are downloaded
+    and the result is cut to it without re-encoding.
+    """
+    own_pool = pool is None
+    pool = pool or HttpPool(max_idle_per_host=concurrency)
+    metrics = as_metrics(status_callback)
+    journal = SegmentJournal(output_file)
+    try:
+        metrics("Lendo playlist HLS...")
+        tracks = load_media_playlists(pool, playlist_url, policy)
+        playlist, media_url = tracks[0][1], tracks[0][2]
+        if any(track_playlist.encrypted for _, track_playlist, _ in tracks):
+            raise UnsupportedPlaylistError("Playlist criptografada (EXT-X-KEY).")
+        if not playlist.endlist:
+            raise LivePlaylistError("Playlist sem EXT-X-ENDLIST (transmissão ao vivo).")
+        if not all(track_playlist.segments for _, track_playlist, _ in tracks):
+            raise UnsupportedPlaylistError("Playlist sem segmentos.")
+        if len(tracks) > 1:
+            selected, offsets = [], []
+            for kind, track_playlist, _ in tracks:
+                segments, offset = select_time_range(track_playlist.segments, *clip) if clip else (track_playlist.segments, 0.0)
+                selected.append((kind, segments))
+                offsets.append(offset)
+            download_tracks(pool, selected, output_file, metrics, concurrency, cache=cache,
+                            cut=clip_cut(clip, offsets) if clip else None)
+            return
+
+        segments, source_url, cut = playlist.segments, media_url, None
+        if clip:
+            segments, offset = select_time_range(playlist.segments, *clip)
+            cut = clip_cut(clip, [offset])
+            # O diário identifica o recorte pelo primeiro segmento (e pelo número de segmentos)
+            source_url = segments[0].uri
+            metrics(f"Recorte: {len(segments)} de {len(playlist.segments)} segmentos, a partir de {offset:.1f}s.")
+
+        fmp4 = any(s.init_section for s in segments)
+        # Um diário existente indica um download interrompido: retoma pelo arquivo parcial em vez do pipe
+        if pipe and not fmp4 and not cut and not os.path.exists(journal.path):
+            mux_pipe = MuxPipe(output_file)
+            try:
+                stream_segments(pool, segments, mux_pipe, metrics, concurrency)
+                metrics("Segmentos enviados. Aguardando o ffmpeg finalizar o arquivo...")
+                with metrics.stage('remux'):
+                    mux_pipe.close()
+            except BaseException:
+                mux_pipe.abort()
+                raise
+            return
+
+        part_file = output_file + ('.part.mp4' if fmp4 else '.part.ts')
+        download_segments(pool, segments, part_file, journal, source_url, metrics, concurrency, cache=cache)
+
+        metrics("Segmentos baixados. Remuxando com ffmpeg...")
+        with metrics.stage('remux'):
+            if cut:
+                remux([part_file], output_file, *cut)
+            else:
+                remux([part_file], output_file)
+        os.remove(part_file)
+        journal.discard()
+    finally:
+        journal.close()
+        if own_pool:
+            pool.close()
+
+
+def download_tracks(pool, tracks, output_file, status_callback, concurrency=DEFAULT_CONCURRENCY, cache=None,
+                    cut=None):
+    """
+    Downloads separate tracks ([(kind, segments)], e.g. video and audio of an HLS rendition group or a DASH
+    presentation) concurrently, each to its own partial file and journal next to output_file, then muxes them
+    once into output_file. cut is clip_cut's (seconds to skip in each track, duration) for a clip whose
+    segments the caller already selected.
+    """
+    metrics = as_metrics(status_callback)
+    journals = []
+    part_files = []
+    errors = []
+
+    def download_track(kind, segments, journal, part_file):
+        try:
+            description = "Baixando vídeo" if kind == 'video' else "Baixando áudio"
+            # O diário identifica a faixa pela URL do primeiro segmento, que muda com a variante escolhida
+            download_segments(pool, segments, part_file, journal, segments[0].uri, metrics,
+                              concurrency, description, cache=cache)
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = []
+        for kind, segments in tracks:
+            part_file = f"{output_file}.{kind}{_part_extension(segments)}"
+            journal = SegmentJournal(f"{output_file}.{kind}")
+            journals.append(journal)
+            part_files.append(part_file)
+            thread = threading.Thread(target=download_track, args=(kind, segments, journal, part_file), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        metrics("Faixas baixadas. Juntando vídeo e áudio com ffmpeg...")
+        with metrics.stage('remux'):
+            if cut:
+                remux(part_files, output_file, *cut)
+            else:
+                remux(part_files, output_file)
+        for part_file in part_files:
+            os.remove(part_file)
+        for journal in journals:
+            journal.discard()
+    finally:
+        for journal in journals:
+            journal.close()
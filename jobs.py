@@ -0,0 +1,375 @@
+"""
+Fila de trabalhos em lote com armazenamento persistente em SQLite.
+
+Cada URL vira um trabalho que passa pelos estados:
+pending -> resolving -> resolved -> downloading -> done (ou failed, ou cancelled).
+A resolução (navegador) e o download têm limites de workers separados,
+e trabalhos interrompidos por um crash voltam para a fila na próxima inicialização.
+Só um processo por vez executa a fila de um banco (o dono, que renova um heartbeat no próprio banco),
+para que um processo não devolva à fila os trabalhos que outro está executando.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from metrics import JobMetrics, StatusSink, JobCancelled
+
+PENDING = 'pending'
+RESOLVING = 'resolving'
+RESOLVED = 'resolved'  # URL direta encontrada, aguardando um worker de download
+DOWNLOADING = 'downloading'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+DEFAULT_MAX_ATTEMPTS = 3
+OWNER_HEARTBEAT = 10 # Segundos entre renovações da posse da fila
+OWNER_STALE_AFTER = 30 # Sem heartbeat por esse tempo, o dono é considerado morto e a fila pode ser assumida
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    output_dir TEXT,
+    output_file TEXT,
+    cookie_path TEXT,
+    state TEXT NOT NULL,
+    title TEXT,
+    video_url TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE TABLE IF NOT EXISTS store_owner (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+
+def output_path(output_dir, title, tag):
+    """
+    File for a job saved in output_dir and named after its title. `tag` (the job or media ID) goes in the name
+    because titles repeat, and two jobs writing the same file would also share its partial file and journal.
+    """
+    title = re.sub(r'[\\/:*?"<>|]', '', title or '').strip() or 'Weverse_VOD'
+    return os.path.join(output_dir or '.', f"{title} [{tag}].mp4")
+
+
+class StoreInUseError(Exception):
+    """Raised by JobQueue.start when another live process (e.g. daemon.py) is already running the same job store."""
+
+
+class JobStore:
+    """SQLite-backed job table. All methods are thread-safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, url, output_dir=None, output_file=None, cookie_path=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Adds a pending job and returns its id."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (url, output_dir, output_file, cookie_path, state, max_attempts, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, output_dir, output_file, cookie_path, PENDING, max_attempts, now, now),
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, state=None):
+        with self._lock:
+            if state:
+                rows = self._conn.execute('SELECT * FROM jobs WHERE state = ? ORDER BY id', (state,)).fetchall()
+            else:
+                rows = self._conn.execute('SELECT * FROM jobs ORDER BY id').fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        """Returns {state: number of jobs}."""
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()
+        return {state: count for state, count in rows}
+
+    def claim(self, from_state, to_state):
+        """Atomically moves the oldest job in from_state to to_state and returns it, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM jobs WHERE state = ? ORDER BY id LIMIT 1', (from_state,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                'UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?', (to_state, time.time(), row['id'])
+            )
+        job = dict(row)
+        job['state'] = to_state
+        return job
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def cancel(self, job_id):
+        """Atomically cancels a job that is waiting in the queue (pending or resolved). Returns True if it was."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET state = ?, updated_at = ? WHERE id = ? AND state IN (?, ?)',
+                (CANCELLED, time.time(), job_id, PENDING, RESOLVED),
+            )
+            return cursor.rowcount == 1
+
+    def recover(self):
+        """
+        Requeues jobs left in-flight by a crash. They go back to pending so the
+        media URL is resolved again (signed CDN URLs may have expired meanwhile).
+        Returns the number of requeued jobs.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET state = ?, updated_at = ? WHERE state IN (?, ?, ?)',
+                (PENDING, time.time(), RESOLVING, RESOLVED, DOWNLOADING),
+            )
+            return cursor.rowcount
+
+    def acquire(self, owner, stale_after=OWNER_STALE_AFTER):
+        """
+        Makes `owner` the only runner of this store. Returns None on success, or the pid of the process that
+        already owns it while its heartbeat is newer than stale_after seconds.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT owner, pid, heartbeat FROM store_owner WHERE id = 1').fetchone()
+                if row and row['owner'] != owner and row['heartbeat'] > now - stale_after:
+                    return row['pid']
+                self._conn.execute('INSERT OR REPLACE INTO store_owner (id, owner, pid, heartbeat) VALUES (1, ?, ?, ?)',
+                                   (owner, os.getpid(), now))
+                return None
+            finally:
+                self._conn.execute('COMMIT')
+
+    def heartbeat(self, owner):
+        """Renews `owner`'s claim on the store."""
+        with self._lock:
+            self._conn.execute('UPDATE store_owner SET heartbeat = ? WHERE owner = ?', (time.time(), owner))
+
+    def release(self, owner):
+        with self._lock:
+            self._conn.execute('DELETE FROM store_owner WHERE owner = ?', (owner,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    Runs jobs from a JobStore through two worker pools.
+
+    resolver(url, cookie_path, status_callback) must return (title, video_url);
+    downloader(video_url, output_file, status_callback) must download the file or raise.
+    A failed stage is retried from resolution until the job reaches max_attempts.
+    Both receive a metrics.JobMetrics as status_callback, publishing the job's events to `metrics_sinks`.
+    on_done(job), if given, is called after a job is downloaded (e.g. archive.ArchiveIndex.record_download).
+    """
+
+    def __init__(self, store, resolver, downloader, status_callback,
+                 resolve_workers=1, download_workers=2, poll_interval=1.0, metrics_sinks=(), on_done=None):
+        self.store = store
+        self.resolver = resolver
+        self.downloader = downloader
+        self.status_callback = status_callback
+        self.resolve_workers = resolve_workers
+        self.download_workers = download_workers
+        self.poll_interval = poll_interval
+        self.metrics_sinks = list(metrics_sinks)
+        self.on_done = on_done
+        self._metrics = {} # id do trabalho -> JobMetrics, até o trabalho terminar
+        self._metrics_lock = threading.Lock()
+        self._cancelled = set() # ids de trabalhos em andamento cujo cancelamento foi pedido
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._owner = uuid.uuid4().hex
+
+    def start(self):
+        """
+        Takes ownership of the store, requeues crashed jobs and starts the worker threads.
+        Raises StoreInUseError if another process is running the store; nothing is requeued then.
+        """
+        pid = self.store.acquire(self._owner)
+        if pid is not None:
+            raise StoreInUseError(f"A fila '{self.store.path}' já está sendo executada por outro processo (PID {pid}).")
+        self._spawn(self._heartbeat_loop, "heartbeat")
+        recovered = self.store.recover()
+        if recovered:
+            self.status_callback(f"{recovered} trabalho(s) interrompido(s) voltaram para a fila.")
+        for i in range(self.resolve_workers):
+            self._spawn(self._resolve_loop, f"resolve-{i}")
+        for i in range(self.download_workers):
+            self._spawn(self._download_loop, f"download-{i}")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def submit(self, url, output_dir=None, output_file=None, cookie_path=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Adds a job and wakes up an idle worker. Returns the job id."""
+        job_id = self.store.add(url, output_dir, output_file, cookie_path, max_attempts)
+        self._notify()
+        return job_id
+
+    def cancel(self, job_id):
+        """
+        Cancels a job. Queued jobs leave the queue at once; a running download stops at its next
+        progress report, and a job being resolved is cancelled when the resolution returns.
+        Returns False if the job doesn't exist or has already finished.
+        """
+        if self.store.cancel(job_id):
+            self.status_callback(f"[Trabalho {job_id}] Cancelado.")
+            self._finish_metrics({'id': job_id}, "cancelado")
+            return True
+        job = self.store.get(job_id)
+        if job is None or job['state'] not in (RESOLVING, DOWNLOADING):
+            return False
+        with self._metrics_lock:
+            self._cancelled.add(job_id)
+            job_metrics = self._metrics.get(job_id)
+        if job_metrics:
+            job_metrics.cancel()
+        return True
+
+    def _check_cancelled(self, job):
+        with self._metrics_lock:
+            if job['id'] not in self._cancelled:
+                return
+        raise JobCancelled(f"Trabalho {job['id']} cancelado.")
+
+    def _cancelled_job(self, job):
+        with self._metrics_lock:
+            self._cancelled.discard(job['id'])
+        self.store.update(job['id'], state=CANCELLED, error="cancelado")
+        self.status_callback(f"[Trabalho {job['id']}] Cancelado.")
+        self._finish_metrics(job, "cancelado")
+        self._notify()
+
+    def stop(self, timeout=None):
+        """Asks the workers to exit after their current job, then gives up ownership of the store."""
+        self._stopping = True
+        self._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.store.release(self._owner)
+
+    def _heartbeat_loop(self):
+        while not self._stopping:
+            self.store.heartbeat(self._owner)
+            with self._wakeup:
+                # stop() pode ter avisado durante a renovação; sem esta checagem, esperaria o intervalo inteiro
+                if not self._stopping:
+                    self._wakeup.wait(OWNER_HEARTBEAT)
+
+    def _notify(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _wait(self):
+        with self._wakeup:
+            self._wakeup.wait(self.poll_interval)
+
+    def _job_callback(self, job):
+        with self._metrics_lock:
+            job_metrics = self._metrics.get(job['id'])
+            if job_metrics is None:
+                prefixed = lambda message: self.status_callback(f"[Trabalho {job['id']}] {message}")
+                job_metrics = JobMetrics(f"job-{job['id']}", sinks=[StatusSink(prefixed)] + self.metrics_sinks)
+                self._metrics[job['id']] = job_metrics
+                if job['id'] in self._cancelled:
+                    job_metrics.cancel()
+            return job_metrics
+
+    def _finish_metrics(self, job, error=None):
+        with self._metrics_lock:
+            job_metrics = self._metrics.pop(job['id'], None)
+        if job_metrics:
+            job_metrics.finish(error)
+
+    def _fail(self, job, error):
+        attempts = job['attempts'] + 1
+        if attempts < job['max_attempts']:
+            self.store.update(job['id'], state=PENDING, attempts=attempts, error=error)
+            self.status_callback(f"[Trabalho {job['id']}] Falhou ({error}). Tentativa {attempts + 1}/{job['max_attempts']} na fila.")
+        else:
+            self.store.update(job['id'], state=FAILED, attempts=attempts, error=error)
+            self.status_callback(f"[Trabalho {job['id']}] Falhou definitivamente: {error}")
+            self._finish_metrics(job, error)
+        self._notify()
+
+    def _resolve_loop(self):
+        while not self._stopping:
+            job = self.store.claim(PENDING, RESOLVING)
+            if job is None:
+                self._wait()
+                continue
+            try:
+                title, video_url = self.resolver(job['url'], job['cookie_path'], self._job_callback(job))
+                self._check_cancelled(job)
+                if not video_url:
+                    raise RuntimeError("URL direta do VOD não encontrada.")
+                output_file = job['output_file'] or output_path(job['output_dir'], title, job['id'])
+                self.store.update(job['id'], state=RESOLVED, title=title, video_url=video_url, output_file=output_file)
+                self._notify()
+            except JobCancelled:
+                self._cancelled_job(job)
+            except Exception as e:
+                print(f"Erro no trabalho {job['id']}: {e}")
+                self._fail(job, str(e))
+
+    def _download_loop(self):
+        while not self._stopping:
+            job = self.store.claim(RESOLVED, DOWNLOADING)
+            if job is None:
+                self._wait()
+                continue
+            try:
+                self._check_cancelled(job)
+                self.downloader(job['video_url'], job['output_file'], self._job_callback(job))
+                self.store.update(job['id'], state=DONE, error=None)
+                self.status_callback(f"[Trabalho {job['id']}] Concluído: {os.path.basename(job['output_file'])}")
+                self._finish_metrics(job)
+            except JobCancelled:
+                self._cancelled_job(job)
+                continue
+            except Exception as e:
+                print(f"Erro no trabalho {job['id']}: {e}")
+                self._fail(job, str(e))
+                continue
+            if self.on_done:
+                try:
+                    self.on_done(job)
+                except Exception as e:
+                    # O arquivo já foi salvo: um erro aqui não faz o trabalho falhar
+                    print(f"Erro ao registrar o trabalho {job['id']}: {e}")
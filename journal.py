@@ -0,0 +1,134 @@
+"""
+Diário de segmentos em disco para retomar downloads interrompidos.
+
+O diário fica ao lado do arquivo de saída (<saida>.journal) em formato JSON Lines:
+a primeira linha descreve o trabalho (URL da playlist, arquivo parcial, número de segmentos)
+e cada linha seguinte registra um segmento já gravado, com tamanho, SHA-256 e o offset final no arquivo parcial.
+Como as linhas só são acrescentadas, registrar um segmento custa uma escrita pequena, não importa o tamanho do VOD.
+"""
+import hashlib
+import json
+import os
+from urllib.parse import urlsplit
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_VERSION = 1
+_HASH_BLOCK = 1024 * 1024
+
+
+def _stream_key(url):
+    # URLs assinadas mudam a cada resolução; o caminho identifica o mesmo stream
+    return urlsplit(url).path
+
+
+class SegmentJournal:
+    """
+    Append-only record of the segments already written, in order, to a partial output file.
+    Call resume() before downloading to learn how many leading segments can be skipped.
+    """
+
+    def __init__(self, output_file):
+        self.path = output_file + JOURNAL_SUFFIX
+        self.offset = 0
+        self._file = None
+
+    def _read(self):
+        header = None
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Última linha pode ter sido cortada por uma interrupção no meio da escrita
+                        break
+                    if header is None:
+                        header = record
+                    else:
+                        entries.append(record)
+        except FileNotFoundError:
+            pass
+        return header, entries
+
+    def _verify(self, part_file, entries):
+        """Returns the leading entries whose bytes in part_file still match the recorded size and checksum."""
+        valid = []
+        offset = 0
+        with open(part_file, 'rb') as f:
+            for index, entry in enumerate(entries):
+                if entry.get('index') != index or entry.get('offset') != offset + entry.get('size', -1):
+                    break
+                digest = hashlib.sha256()
+                remaining = entry['size']
+                while remaining:
+                    block = f.read(min(remaining, _HASH_BLOCK))
+                    if not block:
+                        break
+                    digest.update(block)
+                    remaining -= len(block)
+                if remaining or digest.hexdigest() != entry['sha256']:
+                    break
+                offset = entry['offset']
+                valid.append(entry)
+        return valid
+
+    def resume(self, playlist_url, part_file, segment_count):
+        """
+        Opens the journal for writing and returns the number of segments that are already
+        in part_file and verified, truncating part_file after them.
+        A journal for a different stream, or a missing partial file, starts the job from scratch.
+        """
+        header, entries = self._read()
+        valid = []
+        if (header is not None
+                and header.get('version') == JOURNAL_VERSION
+                and _stream_key(header.get('playlist_url', '')) == _stream_key(playlist_url)
+                and header.get('part_file') == os.path.basename(part_file)
+                and header.get('segment_count') == segment_count
+                and os.path.exists(part_file)):
+            valid = self._verify(part_file, entries)
+
+        self.offset = valid[-1]['offset'] if valid else 0
+        if valid:
+            with open(part_file, 'r+b') as f:
+                f.truncate(self.offset)
+        elif os.path.exists(part_file):
+            os.remove(part_file)
+
+        # Reescreve o diário só com o que foi verificado, para que linhas inválidas não sejam reaproveitadas
+        header = {
+            'version': JOURNAL_VERSION,
+            'playlist_url': playlist_url,
+            'part_file': os.path.basename(part_file),
+            'segment_count': segment_count,
+        }
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in [header] + valid:
+                f.write(json.dumps(record) + '\n')
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        return len(valid)
+
+    def record(self, index, *chunks):
+        """Records that the given chunks (already flushed to the partial file) make up segment `index`."""
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in chunks:
+            digest.update(chunk)
+            size += len(chunk)
+        self.offset += size
+        self._file.write(json.dumps({'index': index, 'size': size, 'sha256': digest.hexdigest(), 'offset': self.offset}) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Closes and deletes the journal once the job has finished."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,216 @@
+"""
+Gravação de transmissões ao vivo (HLS) com leitura periódica da playlist.
+
+A playlist de mídia é relida na cadência do EXT-X-TARGETDURATION; cada segmento novo
+(identificado pelo número de sequência) é baixado em paralelo assim que aparece e gravado
+em ordem no arquivo parcial. Descontinuidades, segmentos perdidos e reinícios da sequência
+abrem um novo arquivo parcial, e no fim as partes são unidas pelo ffmpeg sem recodificar.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+from network import HttpPool, HttpError
+from hls import DEFAULT_CONCURRENCY, UnsupportedPlaylistError, load_media_playlists, parse_media_playlist, fetch_segment
+from mux import concat
+from metrics import as_metrics
+
+PLAYLIST_RETRIES = 5 # Falhas seguidas ao reler a playlist antes de encerrar a gravação
+RECORDED_URIS = 200 # Segmentos recentes cujo caminho é lembrado para reconhecer um reinício da transmissão
+
+
+def _segment_key(segment):
+    # Tokens de assinatura podem mudar a cada releitura; o caminho identifica o segmento
+    return urlsplit(segment.uri).path
+
+
+def stream_restarted(playlist, last_sequence, last_discontinuity_sequence, recorded):
+    """
+    Tells whether a refreshed live playlist belongs to a restarted stream: the whole window fell behind the last
+    recorded sequence number, EXT-X-DISCONTINUITY-SEQUENCE went back, or a sequence number already recorded
+    (`recorded` maps sequence -> segment path) now points to a different segment.
+    """
+    if last_sequence is None or not playlist.segments:
+        return False
+    if playlist.segments[-1].sequence + len(playlist.segments) < last_sequence:
+        return True
+    if last_discontinuity_sequence is not None and playlist.discontinuity_sequence < last_discontinuity_sequence:
+        return True
+    first = playlist.segments[0]
+    return first.sequence in recorded and recorded[first.sequence] != _segment_key(first)
+
+
+class _LiveOutput:
+    """Writes live segments in order, starting a new part file at every discontinuity."""
+
+    def __init__(self, output_file, fmp4):
+        self.output_file = output_file
+        self.extension = '.part.mp4' if fmp4 else '.part.ts'
+        self.parts = []
+        self.bytes_written = 0
+        self.segments_written = 0
+        self._file = None
+        self._init_section = None
+
+    def _new_part(self):
+        self.close()
+        path = f"{self.output_file}.{len(self.parts)}{self.extension}"
+        self.parts.append(path)
+        self._file = open(path, 'wb')
+        self._init_section = None
+
+    def write(self, segment, data, discontinuity, fetch_init):
+        if self._file is None or discontinuity:
+            self._new_part()
+        if segment.init_section is not None and segment.init_section != self._init_section:
+            self._file.write(fetch_init(segment.init_section))
+            self._init_section = segment.init_section
+        self._file.write(data)
+        # Grava imediatamente para manter a latência baixa e não perder dados se o processo cair
+        self._file.flush()
+        self.bytes_written += len(data)
+        self.segments_written += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def record_live(playlist_url, output_file, status_callback, concurrency=DEFAULT_CONCURRENCY,
+                policy=None, pool=None, stop_event=None, cache=None):
+    """
+    Records a live HLS stream into output_file until the playlist gets EXT-X-ENDLIST
+    or stop_event is set, then joins the recorded parts with ffmpeg.
+    Recorded segments are also stored in `cache`, so the VOD published later can reuse them.
+    """
+    own_pool = pool is None
+    pool = pool or HttpPool(max_idle_per_host=concurrency)
+    stop_event = stop_event or threading.Event()
+    metrics = as_metrics(status_callback)
+    output = None
+    try:
+        metrics("Lendo playlist da transmissão ao vivo...")
+        tracks = load_media_playlists(pool, playlist_url, policy)
+        if len(tracks) > 1:
+            # O gravador segue uma única playlist; com áudio separado o ffmpeg grava pela playlist master
+            raise UnsupportedPlaylistError("Transmissão ao vivo com áudio separado (EXT-X-MEDIA).")
+        _, playlist, media_url = tracks[0]
+        fmp4 = any(s.init_section for s in playlist.segments)
+        output = _LiveOutput(output_file, fmp4)
+        print(f"Gravação ao vivo: {media_url}")
+
+        queued = deque() # (segment, future, discontinuity) em ordem de sequência
+        last_sequence = None
+        last_discontinuity_sequence = None
+        recorded = OrderedDict() # sequência -> caminho dos segmentos recentes já enfileirados
+        failures = 0
+        lost = 0
+        next_discontinuity = False
+        recording_started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            def drain(block_until=None):
+                # Grava os segmentos prontos em ordem; com block_until, espera novos até esse instante
+                nonlocal next_discontinuity, lost
+                while queued:
+                    segment, future, discontinuity = queued[0]
+                    if not future.done():
+                        if block_until is None or stop_event.is_set():
+                            return
+                        remaining = block_until - time.monotonic()
+                        if remaining <= 0:
+                            return
+                        wait([future], timeout=min(remaining, 0.5), return_when=FIRST_COMPLETED)
+                        continue
+                    queued.popleft()
+                    try:
+                        data = future.result()
+                    except (HttpError, OSError) as e:
+                        # Segmentos ao vivo saem da janela; não dá para tentar de novo depois
+                        print(f"Segmento {segment.sequence} perdido: {e}")
+                        lost += 1
+                        next_discontinuity = True
+                        continue
+                    output.write(segment, data, discontinuity or next_discontinuity,
+                                 lambda init: fetch_segment(pool, init, metrics=metrics, cache=cache))
+                    next_discontinuity = False
+                    metrics.progress(output.segments_written, None, output.bytes_written)
+                    metrics(
+                        f"Gravando ao vivo: {output.segments_written} segmentos ({output.bytes_written / 1048576:.1f} MB)..."
+                    )
+
+            while True:
+                changed = False
+                if stream_restarted(playlist, last_sequence, last_discontinuity_sequence, recorded):
+                    # A transmissão recomeçou: a numeração nova pode até coincidir com a antiga
+                    print("Sequência de mídia reiniciada pela playlist.")
+                    last_sequence = None
+                    recorded.clear()
+                    next_discontinuity = True
+                last_discontinuity_sequence = playlist.discontinuity_sequence
+
+                for segment in playlist.segments:
+                    if last_sequence is not None and segment.sequence <= last_sequence:
+                        continue
+                    discontinuity = segment.discontinuity
+                    if last_sequence is not None and segment.sequence > last_sequence + 1:
+                        # A janela andou mais rápido do que a leitura: segmentos perdidos
+                        skipped = segment.sequence - last_sequence - 1
+                        print(f"{skipped} segmento(s) saíram da janela antes de serem baixados.")
+                        lost += skipped
+                        discontinuity = True
+                    queued.append((segment, executor.submit(fetch_segment, pool, segment, metrics=metrics, cache=cache), discontinuity))
+                    last_sequence = segment.sequence
+                    recorded[segment.sequence] = _segment_key(segment)
+                    if len(recorded) > RECORDED_URIS:
+                        recorded.popitem(last=False)
+                    changed = True
+
+                if playlist.endlist or stop_event.is_set():
+                    break
+
+                # RFC 8216: relê após a duração alvo; se nada mudou, após metade dela
+                interval = playlist.target_duration or 2.0
+                if not changed:
+                    interval /= 2
+                deadline = time.monotonic() + interval
+                drain(block_until=deadline)
+                if stop_event.wait(max(0.0, deadline - time.monotonic())):
+                    break
+
+                try:
+                    text, final_url = pool.get_text(media_url)
+                    playlist = parse_media_playlist(text, final_url)
+                    failures = 0
+                except (HttpError, OSError, ValueError) as e:
+                    failures += 1
+                    print(f"Erro ao reler a playlist ao vivo ({failures}/{PLAYLIST_RETRIES}): {e}")
+                    if failures >= PLAYLIST_RETRIES:
+                        metrics("Playlist ao vivo indisponível. Encerrando a gravação.")
+                        break
+
+            # Fim da transmissão (ou parada pedida): grava o que ainda está em andamento
+            for _, future, _ in queued:
+                wait([future])
+            drain()
+        metrics.record_stage('download', time.monotonic() - recording_started)
+
+        output.close()
+        if not output.parts:
+            raise RuntimeError("Nenhum segmento da transmissão foi gravado.")
+        if lost:
+            metrics(f"Atenção: {lost} segmento(s) da transmissão foram perdidos.")
+        metrics("Gravação encerrada. Unindo as partes com ffmpeg...")
+        with metrics.stage('remux'):
+            concat(output.parts, output_file)
+        for part in output.parts:
+            os.remove(part)
+    finally:
+        if output:
+            output.close()
+        if own_pool:
+            pool.close()
@@ -0,0 +1,284 @@
+"""
+Eventos estruturados de progresso e métricas de desempenho por trabalho.
+
+Cada download tem um JobMetrics, que também funciona como status_callback: além das mensagens
+de status, os motores informam tempos por etapa, bytes e latência de cada segmento, novas
+tentativas e progresso. Os eventos vão para os sinks configurados (a interface gráfica,
+um arquivo JSON lines e um arquivo de texto no formato do Prometheus).
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # Limites (s) do histograma de latência dos segmentos
+THROUGHPUT_WINDOW = 5.0 # Segundos considerados no cálculo da vazão atual
+PROMETHEUS_INTERVAL = 5.0 # Intervalo mínimo entre regravações do arquivo do Prometheus
+
+# Tipos de evento
+STATUS = 'status'
+STAGE = 'stage'
+SEGMENT = 'segment'
+RETRY = 'retry'
+PROGRESS = 'progress'
+FINISHED = 'finished'
+
+_job_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    """Raised by JobMetrics.progress after the job was cancelled, so the engine stops at its next progress report."""
+
+
+@dataclass
+class Event:
+    """One progress/metrics event of a job. Fields that don't apply to the kind are None."""
+    kind: str
+    job: str
+    timestamp: float
+    message: str = None
+    stage: str = None
+    seconds: float = None
+    bytes: int = None
+    done: int = None
+    total: int = None
+    throughput: float = None
+    error: str = None
+
+    def to_dict(self):
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class JobMetrics:
+    """
+    Collects the metrics of one job and publishes them as Events to `sinks`.
+    Calling the object reports a status message, so it can be passed wherever a status_callback is expected.
+    Thread-safe: parallel segment fetches and concurrent tracks report to the same instance.
+    """
+
+    def __init__(self, job=None, sinks=()):
+        self.job = job or f"{os.getpid()}-{next(_job_ids)}"
+        self.sinks = list(sinks)
+        self.started = time.time()
+        self.stage_seconds = {}
+        self.bytes = 0
+        self.segments = 0
+        self.retries = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1) # O último é +Inf
+        self.latency_sum = 0.0
+        self._window = deque() # (instante, bytes) dentro de THROUGHPUT_WINDOW
+        self.cancelled = threading.Event()
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def _emit(self, kind, **fields):
+        event = Event(kind=kind, job=self.job, timestamp=time.time(), **fields)
+        for sink in self.sinks:
+            try:
+                sink.emit(event, self)
+            except Exception as e:
+                # Um sink com problema (disco cheio, janela fechada) não pode derrubar o download
+                print(f"Erro no sink de métricas {type(sink).__name__}: {e}")
+
+    def __call__(self, message):
+        self._emit(STATUS, message=message)
+
+    def record_stage(self, name, seconds, error=None):
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+        self._emit(STAGE, stage=name, seconds=seconds, error=error)
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as stage `name` (driver_start, cookie_load, page_load, resolution, download, remux...)."""
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.record_stage(name, time.monotonic() - start, error=str(e) or type(e).__name__)
+            raise
+        self.record_stage(name, time.monotonic() - start)
+
+    def segment(self, size, latency):
+        """Records one fetched segment: its size in bytes and how long the request took."""
+        now = time.monotonic()
+        with self._lock:
+            self.bytes += size
+            self.segments += 1
+            self.latency_sum += latency
+            bucket = next((i for i, limit in enumerate(LATENCY_BUCKETS) if latency <= limit), len(LATENCY_BUCKETS))
+            self.latency_buckets[bucket] += 1
+            self._window.append((now, size))
+        self._emit(SEGMENT, bytes=size, seconds=latency)
+
+    def retry(self, error):
+        with self._lock:
+            self.retries += 1
+        self._emit(RETRY, error=str(error))
+
+    def throughput(self):
+        """Current download rate in bytes/s, over the last THROUGHPUT_WINDOW seconds."""
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0][0] > THROUGHPUT_WINDOW:
+                self._window.popleft()
+            if not self._window:
+                return 0.0
+            span = max(now - self._window[0][0], 1.0)
+            return sum(size for _, size in self._window) / span
+
+    def progress(self, done, total, bytes_done):
+        """
+        Reports overall progress: `done` of `total` units (segments, or seconds for ffmpeg) and bytes written.
+        Raises JobCancelled once cancel() was called.
+        """
+        self._emit(PROGRESS, done=done, total=total, bytes=bytes_done, throughput=self.throughput())
+        if self.cancelled.is_set():
+            raise JobCancelled(f"Trabalho {self.job} cancelado.")
+
+    def cancel(self):
+        """Asks the job to stop: the download raises JobCancelled at its next progress report."""
+        self.cancelled.set()
+
+    def finish(self, error=None):
+        """Marks the job as finished (successfully unless `error` is given) and publishes its totals."""
+        self.finished = True
+        self._emit(FINISHED, seconds=time.time() - self.started, bytes=self.bytes,
+                   done=self.segments, error=str(error) if error else None)
+        for sink in self.sinks:
+            sink.job_finished(self)
+
+
+def as_metrics(status_callback):
+    """Returns status_callback itself if it is a JobMetrics, otherwise a JobMetrics that forwards status messages to it."""
+    if isinstance(status_callback, JobMetrics):
+        return status_callback
+    return JobMetrics(sinks=[StatusSink(status_callback)])
+
+
+class StatusSink:
+    """Forwards status messages to a plain callback (e.g. the GUI status label or print)."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, event, metrics):
+        if event.kind == STATUS:
+            self.callback(event.message)
+
+    def job_finished(self, metrics):
+        pass
+
+
+class JsonLinesSink:
+    """Appends every event as one JSON object per line, for later analysis across many jobs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, event, metrics):
+        line = json.dumps(event.to_dict(), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def job_finished(self, metrics):
+        pass
+
+
+class PrometheusSink:
+    """
+    Aggregates the metrics of all jobs and keeps them in a Prometheus text-format file
+    (for node_exporter's textfile collector or any scraper that reads files).
+    The file is rewritten atomically at most every `interval` seconds and whenever a job finishes.
+    """
+
+    def __init__(self, path, interval=PROMETHEUS_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.stage_seconds = {}
+        self.stage_count = {}
+        self.bytes = 0
+        self.segments = 0
+        self.retries = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.jobs = {'success': 0, 'error': 0}
+        self.active = {} # job -> JobMetrics ainda em andamento
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def emit(self, event, metrics):
+        with self._lock:
+            if not metrics.finished:
+                # Requisições ainda em andamento de um trabalho cancelado não o trazem de volta
+                self.active[metrics.job] = metrics
+            if event.kind == STAGE:
+                self.stage_seconds[event.stage] = self.stage_seconds.get(event.stage, 0.0) + event.seconds
+                self.stage_count[event.stage] = self.stage_count.get(event.stage, 0) + 1
+            elif event.kind == SEGMENT:
+                self.bytes += event.bytes
+                self.segments += 1
+                self.latency_sum += event.seconds
+                bucket = next((i for i, limit in enumerate(LATENCY_BUCKETS) if event.seconds <= limit), len(LATENCY_BUCKETS))
+                self.latency_buckets[bucket] += 1
+            elif event.kind == RETRY:
+                self.retries += 1
+            elif event.kind == FINISHED:
+                self.jobs['error' if event.error else 'success'] += 1
+            due = time.monotonic() - self._last_write >= self.interval
+        if due:
+            self.write()
+
+    def job_finished(self, metrics):
+        with self._lock:
+            self.active.pop(metrics.job, None)
+        self.write()
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP weverse_stage_seconds Time spent in each job stage.',
+                '# TYPE weverse_stage_seconds summary',
+            ]
+            for stage in sorted(self.stage_seconds):
+                lines.append(f'weverse_stage_seconds_sum{{stage="{stage}"}} {self.stage_seconds[stage]:.6f}')
+                lines.append(f'weverse_stage_seconds_count{{stage="{stage}"}} {self.stage_count[stage]}')
+            lines += [
+                '# HELP weverse_segment_latency_seconds Latency of segment requests.',
+                '# TYPE weverse_segment_latency_seconds histogram',
+            ]
+            cumulative = 0
+            for limit, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], self.latency_buckets):
+                cumulative += count
+                lines.append(f'weverse_segment_latency_seconds_bucket{{le="{limit}"}} {cumulative}')
+            lines += [
+                f'weverse_segment_latency_seconds_sum {self.latency_sum:.6f}',
+                f'weverse_segment_latency_seconds_count {self.segments}',
+                '# TYPE weverse_downloaded_bytes_total counter',
+                f'weverse_downloaded_bytes_total {self.bytes}',
+                '# TYPE weverse_segment_retries_total counter',
+                f'weverse_segment_retries_total {self.retries}',
+                '# TYPE weverse_jobs_finished_total counter',
+            ]
+            for result, count in self.jobs.items():
+                lines.append(f'weverse_jobs_finished_total{{result="{result}"}} {count}')
+            lines.append('# TYPE weverse_job_throughput_bytes_per_second gauge')
+            active = list(self.active.values())
+        for metrics in active:
+            lines.append(f'weverse_job_throughput_bytes_per_second{{job="{metrics.job}"}} {metrics.throughput():.1f}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        text = self.render()
+        temporary = self.path + '.tmp'
+        with self._lock:
+            self._last_write = time.monotonic()
+            with open(temporary, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temporary, self.path)
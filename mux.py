@@ -0,0 +1,118 @@
+"""
+Etapa final de remux com ffmpeg para os motores de download nativos.
+O ffmpeg aqui só reempacota (-c copy) o que já foi baixado; ele não faz mais nenhum acesso à rede.
+Com MuxPipe, os segmentos vão direto para a entrada padrão do ffmpeg, sem arquivo intermediário.
+"""
+import os
+import subprocess
+import threading
+from collections import deque
+
+
+def remux(input_files, output_file, starts=None, duration=None):
+    """
+    Remuxes one or more local media files into output_file without re-encoding.
+    When several inputs are given (e.g. separate video and audio tracks) every stream of each is mapped.
+    For clips, `starts` gives the seconds to skip at the beginning of each input and `duration` the length
+    to keep; the cut is copy-only, so video starts at the keyframe at or before the requested point.
+    Raises subprocess.CalledProcessError if ffmpeg fails.
+    """
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'warning', '-y']
+    for index, input_file in enumerate(input_files):
+        if starts and starts[index] > 0:
+            command += ['-ss', f'{starts[index]:.3f}']
+        command += ['-i', input_file]
+    if len(input_files) > 1:
+        for index in range(len(input_files)):
+            command += ['-map', str(index)]
+    if duration is not None:
+        command += ['-t', f'{duration:.3f}']
+    if starts or duration is not None:
+        command += ['-avoid_negative_ts', 'make_zero']
+    command += ['-c', 'copy', output_file]
+
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout)
+
+
+def concat(part_files, output_file):
+    """
+    Joins several local parts (e.g. the pieces of a live recording split at discontinuities)
+    into output_file with ffmpeg's concat demuxer, which re-bases each part's timestamps.
+    Raises subprocess.CalledProcessError if ffmpeg fails.
+    """
+    if len(part_files) == 1:
+        remux(part_files, output_file)
+        return
+
+    list_file = output_file + '.concat.txt'
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for part_file in part_files:
+            escaped = os.path.abspath(part_file).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'warning', '-y',
+               '-f', 'concat', '-safe', '0', '-i', list_file, '-c', 'copy', output_file]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout)
+    finally:
+        os.remove(list_file)
+
+
+class MuxPipe:
+    """
+    One ffmpeg process that reads a stream (MPEG-TS by default) from stdin and remuxes it into output_file,
+    so downloaded segments are written to disk only once, already in the final container.
+    write() hands each buffer to the pipe as is (no joining or copying); close() waits for ffmpeg.
+    """
+
+    def __init__(self, output_file, input_format='mpegts'):
+        self.output_file = output_file
+        self.command = ['ffmpeg', '-hide_banner', '-loglevel', 'warning', '-y',
+                        '-f', input_format, '-i', 'pipe:0', '-c', 'copy', output_file]
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE, bufsize=0)
+        # O stderr precisa ser lido continuamente, senão o ffmpeg trava quando o buffer do pipe enche
+        self._errors = deque(maxlen=50)
+        self._stderr_reader = threading.Thread(target=self._read_stderr, daemon=True)
+        self._stderr_reader.start()
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self._errors.append(line.decode('utf-8', 'replace').rstrip())
+
+    def _failed(self, returncode):
+        self._stderr_reader.join(5)
+        return subprocess.CalledProcessError(returncode, self.command, output='\n'.join(self._errors))
+
+    def write(self, data):
+        """Writes one buffer to ffmpeg. Raises CalledProcessError if ffmpeg has exited."""
+        view = memoryview(data)
+        try:
+            while view:
+                written = self.process.stdin.write(view)
+                view = view[written:]
+        except (BrokenPipeError, ValueError):
+            self.process.wait()
+            raise self._failed(self.process.returncode or -1)
+
+    def close(self):
+        """Signals end of stream and waits for ffmpeg to finish the file. Raises CalledProcessError on failure."""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        if returncode != 0:
+            raise self._failed(returncode)
+
+    def abort(self):
+        """Kills ffmpeg and removes the incomplete output file."""
+        self.process.kill()
+        self.process.wait()
+        try:
+            os.remove(self.output_file)
+        except OSError:
+            pass
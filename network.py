@@ -0,0 +1,210 @@
+"""
+Cliente HTTP com pool de conexões keep-alive, usado pelos motores de download nativos.
+
+Usa apenas a biblioteca padrão (http.client) para não adicionar dependências ao projeto.
+Com um scheduler.Scheduler, as conexões por servidor e a banda são limitadas entre todos os pools.
+"""
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit, urljoin
+
+from scheduler import TokenBucket, THROTTLE_STATUS, parse_retry_after
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+DEFAULT_TIMEOUT = 30
+MAX_REDIRECTS = 5
+READ_CHUNK = 64 * 1024 # Com limite de banda, o corpo é lido em blocos para a vazão ficar uniforme
+
+# Erros que indicam que uma conexão keep-alive foi fechada pelo servidor entre requisições
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+def cookie_header(cookies, url):
+    """
+    Builds the Cookie header value for url from Selenium-style cookie dicts
+    (name, value, domain, path, secure, expiry), skipping expired and non-matching cookies.
+    Returns None when no cookie applies.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    path = parts.path or '/'
+    now = time.time()
+    pairs = []
+    for cookie in cookies:
+        domain = (cookie.get('domain') or host).lower()
+        if domain.startswith('.'):
+            if host != domain[1:] and not host.endswith(domain):
+                continue
+        elif host != domain and not host.endswith('.' + domain):
+            continue
+        if not path.startswith(cookie.get('path') or '/'):
+            continue
+        if cookie.get('secure') and parts.scheme != 'https':
+            continue
+        expiry = cookie.get('expiry')
+        if expiry is not None and expiry < now:
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return '; '.join(pairs) or None
+
+
+class HttpError(Exception):
+    """Raised when the server answers with an HTTP error status."""
+
+    def __init__(self, status, url, headers=None):
+        super().__init__(f"HTTP {status} ao acessar {url}")
+        self.status = status
+        self.url = url
+        self.headers = headers or {}
+
+
+class HttpPool:
+    """
+    Thread-safe pool of persistent HTTP connections, keyed by (scheme, host, port).
+    Connections are reused across requests so segment downloads skip the TCP/TLS handshake.
+    If `cookies` (Selenium-style dicts) is given, the matching ones are sent with every request.
+    With a `scheduler` (a scheduler.Scheduler shared by all pools) requests wait for a free per-host slot
+    and count against its global bandwidth limit; `bandwidth` (bytes/s) additionally limits this pool alone.
+    """
+
+    def __init__(self, max_idle_per_host=16, timeout=DEFAULT_TIMEOUT, headers=None, cookies=None,
+                 scheduler=None, bandwidth=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, "Accept": "*/*"}
+        if headers:
+            self.headers.update(headers)
+        self.cookies = cookies or []
+        self.scheduler = scheduler
+        self.bandwidth = TokenBucket(bandwidth) if bandwidth else None
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _read_body(self, response):
+        if not self.bandwidth and not (self.scheduler and self.scheduler.bandwidth):
+            return response.read()
+        chunks = []
+        while True:
+            chunk = response.read(READ_CHUNK)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+            if self.bandwidth:
+                self.bandwidth.consume(len(chunk))
+            if self.scheduler:
+                self.scheduler.consume(len(chunk))
+
+    def _send(self, method, url, headers):
+        if not self.scheduler:
+            return self._send_now(method, url, headers)
+        host = urlsplit(url).hostname
+        with self.scheduler.slot(host):
+            status, response_headers, body = self._send_now(method, url, headers)
+        if status in THROTTLE_STATUS:
+            self.scheduler.throttled(host, parse_retry_after(response_headers.get('retry-after')))
+        elif status < 400:
+            self.scheduler.succeeded(host)
+        return status, response_headers, body
+
+    def _send_now(self, method, url, headers):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Esquema de URL não suportado: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        request_headers = dict(self.headers)
+        if self.cookies:
+            cookie = cookie_header(self.cookies, url)
+            if cookie:
+                request_headers['Cookie'] = cookie
+        if headers:
+            request_headers.update(headers)
+
+        # Uma conexão reaproveitada pode ter sido fechada pelo servidor; nesse caso tenta de novo com uma nova
+        for attempt in range(2):
+            conn = self._acquire(key)
+            try:
+                conn.request(method, path, headers=request_headers)
+                response = conn.getresponse()
+                body = self._read_body(response)
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, body
+
+    def request(self, method, url, headers=None):
+        """
+        Performs a request following redirects.
+        Returns a (status, headers, body, final_url) tuple; headers keys are lower-case.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._send(method, url, headers)
+            if status in (301, 302, 303, 307, 308) and "location" in response_headers:
+                url = urljoin(url, response_headers["location"])
+                if status == 303:
+                    method = "GET"
+                continue
+            return status, response_headers, body, url
+        raise HttpError(status, url, response_headers)
+
+    def get(self, url, headers=None):
+        """Downloads url and returns the response body, raising HttpError on 4xx/5xx."""
+        status, response_headers, body, final_url = self.request("GET", url, headers)
+        if status >= 400:
+            raise HttpError(status, final_url, response_headers)
+        return body
+
+    def get_text(self, url, headers=None):
+        """Like get(), but decodes the body as UTF-8 and also returns the final URL after redirects."""
+        status, response_headers, body, final_url = self.request("GET", url, headers)
+        if status >= 400:
+            raise HttpError(status, final_url, response_headers)
+        return body.decode("utf-8", errors="replace"), final_url
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
@@ -0,0 +1,96 @@
+"""
+Busca antecipada dos metadados dos VODs (título, miniatura, duração e variantes).
+
+A interface pede os metadados assim que uma URL é colada; eles são resolvidos em segundo plano
+por um pequeno pool de threads, então a janela nunca espera o navegador. A resolução passa pelo
+cache de URLs (core.resolve_video), de modo que o download depois reaproveita a URL do manifesto
+sem carregar a página de novo.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_WORKERS = 2
+MAX_ENTRIES = 100 # Resultados guardados em memória (os mais antigos são descartados)
+
+
+def format_duration(seconds):
+    """Formats a duration in seconds as H:MM:SS (or M:SS under one hour)."""
+    seconds = int(round(seconds))
+    hours, minutes, seconds = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+@dataclass
+class VideoMetadata:
+    page_url: str
+    title: str
+    video_url: Optional[str] = None
+    thumbnail: Optional[str] = None # URL da imagem (og:image da página)
+    duration: Optional[float] = None # Segundos; None para transmissões ao vivo ou arquivos diretos
+    variants: list = field(default_factory=list) # Variantes de vídeo do manifesto (dicts de hls/dash)
+
+    def qualities(self):
+        """Distinct variant heights, best first, e.g. ['1080p', '720p']."""
+        heights = sorted({variant['resolution'][1] for variant in self.variants if variant.get('resolution')},
+                         reverse=True)
+        return [f"{height}p" for height in heights]
+
+    def describe(self):
+        """One-line summary for the interface: title, duration and available qualities."""
+        parts = [self.title]
+        if self.duration:
+            parts.append(format_duration(self.duration))
+        if self.qualities():
+            parts.append(', '.join(self.qualities()))
+        if not self.video_url:
+            parts.append("URL do vídeo ainda não encontrada")
+        return ' | '.join(parts)
+
+
+def _has_media_url(future):
+    return future.exception() is None and future.result().video_url is not None
+
+
+class MetadataPrefetcher:
+    """
+    Resolves VideoMetadata for page URLs on a thread pool, with fetch(page_url) doing the actual work.
+    Requests for a URL already in flight or resolved share the same Future; one that failed or found no media URL
+    (e.g. before the user logged in) is retried on the next request.
+    """
+
+    def __init__(self, fetch, workers=DEFAULT_WORKERS, max_entries=MAX_ENTRIES):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def request(self, page_url):
+        """Starts resolving page_url unless it is already in flight or resolved. Returns its Future; never blocks."""
+        with self._lock:
+            future = self._futures.get(page_url)
+            if future is None or future.cancelled() or (future.done() and not _has_media_url(future)):
+                future = self._executor.submit(self.fetch, page_url)
+                self._futures[page_url] = future
+            self._futures.move_to_end(page_url)
+            while len(self._futures) > self.max_entries:
+                self._futures.popitem(last=False)
+        return future
+
+    def peek(self, page_url):
+        """The metadata already resolved for page_url, or None if it is still running, failed or was never requested."""
+        with self._lock:
+            future = self._futures.get(page_url)
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def close(self):
+        """Drops the requests that haven't started; the running ones finish in the background."""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,108 @@
+"""
+Resolução da URL do manifesto sem navegador.
+
+Carrega os cookies salvos por save_cookies num cliente HTTP simples, baixa a página
+do VOD (e os endpoints de API configurados) e procura a URL do manifesto no HTML/JSON.
+Quando nada é encontrado, quem chama deve recorrer ao Selenium.
+"""
+import html
+import re
+from urllib.parse import urlsplit
+
+from network import HttpPool, HttpError
+
+# Domínios que geralmente hospedam conteúdo de vídeo do Weverse (mesmo filtro de extract_video_url_for_vods)
+MEDIA_HOSTS = ['weverse', 'cloudfront.net', 'akamai.net', 'cdn.weverse.io']
+
+# Endpoints de API consultados quando a página não traz o manifesto.
+# '{post_id}' é substituído pelo ID extraído da URL da página (ex: 1-123456789).
+API_ENDPOINTS = []
+
+# Prioridade de retorno: M3U8 (HLS) > MPD (DASH) > MP4 > Manifest (pode ser o próprio MPD/M3U8)
+_PRIORITY = ['.m3u8', '.mpd', '.mp4', 'manifest.json']
+
+_URL_RE = re.compile(r'https?://[^\s"\'<>\\]+')
+_POST_ID_RE = re.compile(r'/(?:media|live)/(\d+-\d+)')
+_OG_TITLE_RE = re.compile(r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\']([^"\']*)["\']', re.IGNORECASE)
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+_OG_IMAGE_RE = re.compile(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']*)["\']', re.IGNORECASE)
+
+
+def _unescape(text):
+    # URLs dentro de JSON embutido costumam vir como https:\/\/... ou https://...
+    return text.replace('\\u002F', '/').replace('\\u002f', '/').replace('\\/', '/').replace('&amp;', '&')
+
+
+def find_media_urls(text):
+    """Returns every candidate media URL (on a known video host) found in an HTML or JSON body, in order."""
+    urls = []
+    for url in _URL_RE.findall(_unescape(text)):
+        url = url.rstrip(',;)')
+        if url not in urls and any(domain in url for domain in MEDIA_HOSTS) \
+                and any(kind in url for kind in _PRIORITY):
+            urls.append(url)
+    return urls
+
+
+def pick_media_url(urls):
+    """Picks the best candidate: M3U8 > MPD > MP4 > manifest.json. Returns None for an empty list."""
+    for kind in _PRIORITY:
+        for url in urls:
+            if kind in urlsplit(url).path or (kind == 'manifest.json' and kind in url):
+                return url
+    return None
+
+
+def find_title(page_html):
+    """Returns the og:title (or <title>) of a page, or an empty string."""
+    match = _OG_TITLE_RE.search(page_html) or _TITLE_RE.search(page_html)
+    return html.unescape(match.group(1)).strip() if match else ''
+
+
+def find_thumbnail(page_html):
+    """Returns the og:image of a page, or None."""
+    match = _OG_IMAGE_RE.search(page_html)
+    thumbnail = html.unescape(match.group(1)).strip() if match else ''
+    return thumbnail or None
+
+
+def resolve_page(video_page_url, cookies, pool=None, api_endpoints=None):
+    """
+    Tries to find the media URL of a VOD page with plain HTTP requests.
+    Returns (title, video_url, thumbnail URL or None); video_url is None when the page and API responses
+    don't expose it. HTTP/network errors are not raised: they just mean the caller should fall back to Selenium.
+    """
+    own_pool = pool is None
+    pool = pool or HttpPool(cookies=cookies, headers={'Accept': 'text/html,application/json;q=0.9,*/*;q=0.8'})
+    title = ''
+    thumbnail = None
+    candidates = []
+    try:
+        try:
+            page_html, final_url = pool.get_text(video_page_url)
+            title = find_title(page_html)
+            thumbnail = find_thumbnail(page_html)
+            candidates += find_media_urls(page_html)
+        except (HttpError, OSError) as e:
+            print(f"Resolução sem navegador: falha ao baixar a página ({e}).")
+            final_url = video_page_url
+
+        if not candidates:
+            match = _POST_ID_RE.search(urlsplit(final_url).path)
+            post_id = match.group(1) if match else None
+            for template in (API_ENDPOINTS if api_endpoints is None else api_endpoints):
+                if '{post_id}' in template and not post_id:
+                    continue
+                try:
+                    body, _ = pool.get_text(template.format(post_id=post_id), headers={'Referer': video_page_url})
+                except (HttpError, OSError) as e:
+                    print(f"Resolução sem navegador: falha no endpoint {template} ({e}).")
+                    continue
+                candidates += find_media_urls(body)
+                if candidates:
+                    break
+    finally:
+        if own_pool:
+            pool.close()
+
+    return title, pick_media_url(candidates), thumbnail
@@ -0,0 +1,141 @@
+"""
+Agendador compartilhado das requisições de rede dos motores de download.
+
+Com vários downloads ao mesmo tempo, as requisições disputam os mesmos servidores da CDN e as
+rajadas levam a respostas 429/403. O Scheduler limita as conexões simultâneas por servidor,
+divide a banda por um token bucket global (e um por trabalho, no HttpPool), e pausa um servidor
+inteiro quando ele pede para esperar (429/503 com Retry-After), em vez de cada conexão insistir
+sozinha. As novas tentativas usam backoff exponencial com jitter.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 8
+RETRY_BASE_DELAY = 0.5 # Espera (s) antes da primeira nova tentativa, dobrada a cada tentativa
+RETRY_MAX_DELAY = 30.0 # Espera máxima entre tentativas
+MAX_RETRY_AFTER = 300.0 # Retry-After maiores que isso são limitados (um servidor mal configurado não trava o download)
+
+# Respostas que indicam sobrecarga ou limitação temporária; 403 entra porque algumas CDNs o usam contra rajadas
+RETRYABLE_STATUS = {403, 408, 425, 429, 500, 502, 503, 504}
+# Respostas em que o servidor pede explicitamente para diminuir o ritmo: o servidor todo é pausado
+THROTTLE_STATUS = {429, 503}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def retry_delay(attempt, retry_after=None, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """
+    Delay before retry number `attempt` (0-based): exponential backoff with full jitter,
+    so workers that failed together don't retry together. Never shorter than `retry_after`.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class TokenBucket:
+    """
+    Bandwidth limiter: `rate` bytes/s on average, with bursts up to `burst` bytes (default: one second's worth).
+    consume() takes the bytes right away and sleeps off any debt, so a large read is paced by the reads after it.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class Scheduler:
+    """
+    Admission control shared by every HttpPool of the process.
+    Caps concurrent requests per host, applies the global bandwidth limit (bytes/s, None = unlimited)
+    and holds back all requests to a host that answered 429/503 until its Retry-After (or backoff) elapses.
+    """
+
+    def __init__(self, max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST, bandwidth=None):
+        self.max_connections_per_host = max_connections_per_host
+        self.bandwidth = TokenBucket(bandwidth) if bandwidth else None
+        self._slots = {} # servidor -> BoundedSemaphore
+        self._paused_until = {} # servidor -> instante (monotonic) em que volta a receber requisições
+        self._throttles = {} # servidor -> pausas seguidas, para o backoff quando não há Retry-After
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            semaphore = self._slots.get(host)
+            if semaphore is None:
+                semaphore = self._slots[host] = threading.BoundedSemaphore(self.max_connections_per_host)
+            return semaphore
+
+    def _wait_until_resumed(self, host):
+        while True:
+            with self._lock:
+                remaining = self._paused_until.get(host, 0.0) - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    @contextmanager
+    def slot(self, host):
+        """Holds one of the host's connection slots for the enclosed request, waiting out any pause first."""
+        self._wait_until_resumed(host)
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        try:
+            # A pausa pode ter começado enquanto esperava a vaga
+            self._wait_until_resumed(host)
+            yield
+        finally:
+            semaphore.release()
+
+    def throttled(self, host, retry_after=None):
+        """Pauses all requests to `host` after a 429/503, for `retry_after` seconds or a growing jittered backoff."""
+        with self._lock:
+            count = self._throttles.get(host, 0)
+            self._throttles[host] = count + 1
+            delay = retry_delay(count, retry_after)
+            now = time.monotonic()
+            already_paused = self._paused_until.get(host, 0.0) > now
+            self._paused_until[host] = max(self._paused_until.get(host, 0.0), now + delay)
+        if not already_paused:
+            print(f"Servidor {host} pediu para diminuir o ritmo. Pausando por {delay:.1f} s.")
+
+    def succeeded(self, host):
+        """Resets the host's throttle backoff after a successful response."""
+        if host in self._throttles:
+            with self._lock:
+                self._throttles.pop(host, None)
+
+    def consume(self, amount):
+        """Charges `amount` downloaded bytes against the global bandwidth limit."""
+        if self.bandwidth:
+            self.bandwidth.consume(amount)
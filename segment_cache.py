@@ -0,0 +1,180 @@
+"""
+Cache de segmentos em disco, endereçado por conteúdo e compartilhado entre trabalhos.
+
+Cada segmento baixado é guardado uma única vez, com o nome do seu hash SHA-256, e um índice
+SQLite liga a URL normalizada do segmento (sem os parâmetros de assinatura da CDN, que mudam a
+cada resolução) e a faixa de bytes a esse hash. Assim, baixar de novo o mesmo VOD com outra
+política de qualidade, repetir um trabalho que falhou ou baixar o VOD de uma live já gravada
+reaproveita os segmentos do disco. O tamanho total é limitado, removendo os menos usados (LRU).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Parâmetros de assinatura/expiração das CDNs (CloudFront, S3, Akamai e genéricos), ignorados na chave
+SIGNED_PARAMS = {
+    'expires', 'signature', 'key-pair-id', 'policy', 'hdnts', 'hdnea', '__token__', 'token',
+    'exp', 'sig', 'auth', 'auth_key', 'x-amz-algorithm', 'x-amz-credential', 'x-amz-date',
+    'x-amz-expires', 'x-amz-signedheaders', 'x-amz-signature', 'x-amz-security-token',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    key TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_lru ON segments (last_used);
+CREATE INDEX IF NOT EXISTS segments_hash ON segments (hash);
+"""
+
+
+def normalize_segment_url(url):
+    """Drops CDN signature/expiry parameters and sorts the rest, so re-signed URLs of one segment match."""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name.lower() not in SIGNED_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ''))
+
+
+def segment_key(uri, byterange=None):
+    """Cache key of a segment: its normalized URL plus the byte range, if any."""
+    key = normalize_segment_url(uri)
+    if byterange:
+        length, offset = byterange
+        key += f'#{offset}-{offset + length - 1}'
+    return key
+
+
+class SegmentCache:
+    """
+    On-disk segment store (directory of blobs named by SHA-256 plus an SQLite index).
+    Bounded to max_bytes of unique content; least recently used entries are evicted first.
+    Thread-safe, and several processes can share one directory.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.sqlite3'),
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._size = self._unique_size() # Estimativa do tamanho em disco, recalculada ao remover entradas
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def get(self, uri, byterange=None):
+        """Returns the cached bytes of a segment, or None. Blobs that fail their hash check are dropped."""
+        key = segment_key(uri, byterange)
+        with self._lock:
+            row = self._conn.execute('SELECT hash FROM segments WHERE key = ?', (key,)).fetchone()
+        data = None
+        if row:
+            try:
+                with open(self._blob_path(row[0]), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None and hashlib.sha256(data).hexdigest() != row[0]:
+                data = None
+            with self._lock:
+                if data is None:
+                    self._conn.execute('DELETE FROM segments WHERE key = ?', (key,))
+                else:
+                    self._conn.execute('UPDATE segments SET last_used = ? WHERE key = ?', (time.time(), key))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_served += len(data)
+        return data
+
+    def put(self, uri, data, byterange=None):
+        """
+        Stores a segment (identical content is kept once) and evicts old entries if over the size limit.
+        Disk errors are only reported: a full or broken cache must not fail the download.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        try:
+            new_blob = not os.path.exists(path)
+            if new_blob:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temporary = f"{path}.{threading.get_ident()}.tmp"
+                with open(temporary, 'wb') as f:
+                    f.write(data)
+                os.replace(temporary, path)
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO segments (key, hash, size, last_used) VALUES (?, ?, ?, ?)',
+                    (segment_key(uri, byterange), digest, len(data), time.time()),
+                )
+                self.stores += 1
+                if new_blob:
+                    self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Não foi possível gravar o segmento no cache: {e}")
+
+    def _unique_size(self):
+        return self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT hash, MAX(size) AS size FROM segments GROUP BY hash)'
+        ).fetchone()[0]
+
+    def _evict(self):
+        with self._lock:
+            # Outro processo pode ter removido entradas: confere o tamanho real antes de remover
+            total = self._unique_size()
+            rows = self._conn.execute('SELECT key, hash, size FROM segments ORDER BY last_used').fetchall()
+            for key, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute('DELETE FROM segments WHERE key = ?', (key,))
+                self.evictions += 1
+                # O blob só sai do disco quando nenhuma outra chave aponta para o mesmo conteúdo
+                if not self._conn.execute('SELECT 1 FROM segments WHERE hash = ? LIMIT 1', (digest,)).fetchone():
+                    try:
+                        os.remove(self._blob_path(digest))
+                    except OSError:
+                        pass
+                    total -= size
+            self._size = total
+
+    def stats(self):
+        """Hit/miss counters of this process plus the current size of the store, for tuning max_bytes."""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM segments').fetchone()[0]
+            size = self._unique_size()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bytes_served': self.bytes_served,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
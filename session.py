@@ -0,0 +1,123 @@
+"""
+Sessão do Weverse (cookies de login) compartilhada por todo o processo.
+
+O arquivo de cookies é lido e normalizado uma única vez (e relido só se mudar no disco);
+a validade da sessão é verificada localmente pela expiração dos cookies, sem abrir páginas.
+Os navegadores recebem todos os cookies numa única chamada CDP (Network.setCookies), sem
+navegar até a página inicial nem esperar, e os clientes HTTP usam a mesma lista de cookies.
+"""
+import json
+import os
+import threading
+import time
+
+HOME_URL = "https://weverse.io/home"
+# Cookies que carregam o login; se algum estiver no arquivo, a sessão só é válida enquanto ele não expirar
+AUTH_COOKIE_NAMES = ('we2_access_token', 'we2_refresh_token')
+EXPIRY_MARGIN = 60 # Segundos de folga: cookies que expiram antes disso já contam como expirados
+
+_SAME_SITE = {
+    'strict': 'Strict', 'lax': 'Lax', 'none': 'None', 'no_restriction': 'None',
+}
+
+_sessions = {} # caminho -> Session
+_sessions_lock = threading.Lock()
+
+
+def normalize_cookie(cookie):
+    """
+    Converts a cookie exported by Selenium (get_cookies) or by a browser extension
+    (expirationDate, hostOnly, lower-case sameSite) into one Selenium-style dict.
+    """
+    expiry = cookie.get('expiry', cookie.get('expirationDate'))
+    normalized = {
+        'name': cookie['name'],
+        'value': cookie.get('value', ''),
+        'domain': cookie.get('domain') or '.weverse.io',
+        'path': cookie.get('path') or '/',
+        'secure': bool(cookie.get('secure', False)),
+        'httpOnly': bool(cookie.get('httpOnly', False)),
+    }
+    if expiry is not None and not cookie.get('session'):
+        normalized['expiry'] = int(expiry)
+    same_site = _SAME_SITE.get(str(cookie.get('sameSite', '')).lower())
+    if same_site:
+        normalized['sameSite'] = same_site
+    return normalized
+
+
+class Session:
+    """The normalized cookie jar of one cookie file."""
+
+    def __init__(self, path, cookies):
+        self.path = path
+        self.cookies = cookies
+
+    @classmethod
+    def load(cls, path):
+        """Reads and normalizes a cookie file (a JSON list of cookie dicts). Raises OSError/ValueError."""
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        if not isinstance(raw, list):
+            raise ValueError(f"'{path}' não é uma lista de cookies.")
+        return cls(path, [normalize_cookie(cookie) for cookie in raw if cookie.get('name')])
+
+    def _alive(self, cookie, now):
+        return 'expiry' not in cookie or cookie['expiry'] > now + EXPIRY_MARGIN
+
+    def valid_cookies(self):
+        """The cookies that haven't expired yet (the ones worth sending)."""
+        now = time.time()
+        return [cookie for cookie in self.cookies if self._alive(cookie, now)]
+
+    def is_valid(self):
+        """True while the login cookies haven't expired. Checked locally, without any request."""
+        now = time.time()
+        auth = [c for c in self.cookies if c['name'] in AUTH_COOKIE_NAMES]
+        if auth:
+            return any(self._alive(cookie, now) for cookie in auth)
+        return any(self._alive(cookie, now) for cookie in self.cookies)
+
+    def cdp_cookies(self):
+        """The valid cookies in the format of the CDP Network.setCookies command."""
+        cookies = []
+        for cookie in self.valid_cookies():
+            param = {key: cookie[key] for key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly')}
+            if 'expiry' in cookie:
+                param['expires'] = cookie['expiry']
+            if 'sameSite' in cookie:
+                param['sameSite'] = cookie['sameSite']
+            cookies.append(param)
+        return cookies
+
+    def apply(self, driver):
+        """
+        Injects the valid cookies into a Chrome driver with one Network.setCookies call, without navigating.
+        Drivers without CDP fall back to opening the home page and adding the cookies one by one.
+        """
+        try:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': self.cdp_cookies()})
+            return
+        except Exception as e:
+            print(f"Network.setCookies indisponível ({e}). Adicionando cookies pela página inicial.")
+        driver.get(HOME_URL)
+        for cookie in self.valid_cookies():
+            try:
+                driver.add_cookie(cookie)
+            except Exception as e:
+                print(f"Aviso: Não foi possível adicionar o cookie '{cookie.get('name', 'N/A')}': {e}")
+
+
+def get_session(path):
+    """
+    Returns the shared Session of a cookie file, parsing it only the first time
+    and again only after the file changes on disk. Raises OSError/ValueError.
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _sessions_lock:
+        cached = _sessions.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, Session.load(path))
+            _sessions[path] = cached
+        return cached[1]
@@ -0,0 +1,27 @@
+import archive
+import jobs
+
+
+def test_done_job_whose_file_is_gone_is_queued_again(tmp_path):
+    index = archive.ArchiveIndex(str(tmp_path / 'archive.sqlite3'))
+    store = jobs.JobStore(str(tmp_path / 'jobs.sqlite3'))
+    try:
+        item = archive.ListedMedia('1-100', 'https://weverse.io/a/media/1-100', 'Live')
+        output_file = jobs.output_path(str(tmp_path), item.title, item.media_id)
+        job_id = store.add(item.url, output_file=output_file)
+        index.mark_queued('a', [(item, job_id)], 'best')
+        store.update(job_id, state=jobs.DONE)
+
+        # O arquivo sumiu antes de o índice registrar o download
+        assert archive._change_reason(index.get(item.media_id), item, 'best', store, False) == "arquivo ausente"
+    finally:
+        store.close()
+        index.close()
+
+
+def test_output_path_keeps_same_titled_vods_apart(tmp_path):
+    first = jobs.output_path(str(tmp_path), 'Live: "ensaio"', '1-100')
+    second = jobs.output_path(str(tmp_path), 'Live: "ensaio"', '1-101')
+    assert first == str(tmp_path / 'Live ensaio [1-100].mp4')
+    assert first != second
+    assert jobs.output_path(str(tmp_path), '', '1-102') == str(tmp_path / 'Weverse_VOD [1-102].mp4')
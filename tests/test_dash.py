@@ -0,0 +1,168 @@
+import pytest
+
+import dash
+from fixture_server import FixtureServer
+from network import HttpPool
+
+MPD_URL = 'https://cdn.example.com/vod/manifest.mpd'
+
+
+def _mpd(period, duration='PT20S'):
+    return f'''<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="{duration}">
+ <Period>{period}</Period>
+</MPD>'''
+
+
+def _segments(period, duration='PT20S', kind='video'):
+    representation = next(r for r in dash.parse_mpd(_mpd(period, duration), MPD_URL) if r['kind'] == kind)
+    return dash.representation_segments(None, representation)
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('PT20S', 20),
+    ('PT1H2M3.5S', 3723.5),
+    ('P1DT30M', 86400 + 1800),
+    ('PT0.25S', 0.25),
+])
+def test_parse_duration(value, seconds):
+    assert dash.parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize('value', ['', 'P', 'PT', '20S', 'PT1X'])
+def test_parse_duration_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        dash.parse_duration(value)
+
+
+def test_number_template_with_padding():
+    segments, single_file = _segments('''
+  <AdaptationSet contentType="video">
+   <SegmentTemplate media="$RepresentationID$/seg_$Number%05d$.m4s" initialization="$RepresentationID$/init.mp4"
+                    startNumber="7" timescale="1000" duration="4000"/>
+   <Representation id="v1080" bandwidth="5000000" width="1920" height="1080"/>
+  </AdaptationSet>''', 'PT10S')
+    assert not single_file
+    assert [s.uri for s in segments] == [
+        'https://cdn.example.com/vod/v1080/seg_00007.m4s',
+        'https://cdn.example.com/vod/v1080/seg_00008.m4s',
+        'https://cdn.example.com/vod/v1080/seg_00009.m4s',
+    ]
+    assert all(s.duration == 4 for s in segments)
+    assert segments[0].init_section.uri == 'https://cdn.example.com/vod/v1080/init.mp4'
+
+
+def test_time_template_with_timeline_repeat_to_end():
+    # r=-1 repete o S até cobrir o fim do período (20 s): 2 s + 5 x 4 s
+    segments, _ = _segments('''
+  <AdaptationSet contentType="video">
+   <SegmentTemplate media="chunk_$Time$_$Bandwidth$.m4s" initialization="init_$Bandwidth$.mp4" timescale="90000">
+    <SegmentTimeline>
+     <S t="0" d="180000"/>
+     <S d="360000" r="-1"/>
+    </SegmentTimeline>
+   </SegmentTemplate>
+   <Representation id="v" bandwidth="800000" width="640" height="360"/>
+  </AdaptationSet>''', 'PT20S')
+    assert [s.uri.rsplit('/', 1)[1] for s in segments] == [
+        'chunk_0_800000.m4s',
+        'chunk_180000_800000.m4s',
+        'chunk_540000_800000.m4s',
+        'chunk_900000_800000.m4s',
+        'chunk_1260000_800000.m4s',
+        'chunk_1620000_800000.m4s',
+    ]
+    assert [s.duration for s in segments] == [2, 4, 4, 4, 4, 4]
+    assert [s.sequence for s in segments] == list(range(6))
+
+
+def test_segment_list_with_media_range():
+    segments, single_file = _segments('''
+  <AdaptationSet contentType="audio">
+   <Representation id="a" bandwidth="128000">
+    <BaseURL>audio/track.mp4</BaseURL>
+    <SegmentList timescale="1000" duration="5000">
+     <Initialization sourceURL="track.mp4" range="0-799"/>
+     <SegmentURL media="track.mp4" mediaRange="800-1799"/>
+     <SegmentURL media="track.mp4" mediaRange="1800-2299"/>
+    </SegmentList>
+   </Representation>
+  </AdaptationSet>''', 'PT10S', kind='audio')
+    assert not single_file
+    assert [s.byterange for s in segments] == [(1000, 800), (500, 1800)]
+    assert all(s.uri == 'https://cdn.example.com/vod/audio/track.mp4' for s in segments)
+    assert segments[0].init_section.byterange == (800, 0)
+    assert [s.duration for s in segments] == [5, 5]
+
+
+def test_template_attributes_inherited_from_outer_levels():
+    # media e timescale vêm do AdaptationSet; a Representation só troca a duração e o número inicial
+    segments, _ = _segments('''
+  <AdaptationSet contentType="video" mimeType="video/mp4" width="1280" height="720">
+   <BaseURL>video/</BaseURL>
+   <SegmentTemplate media="$RepresentationID$_$Number$.m4s" timescale="10" duration="20"/>
+   <Representation id="hd" bandwidth="3000000">
+    <SegmentTemplate duration="40" startNumber="0"/>
+   </Representation>
+  </AdaptationSet>''', 'PT12S')
+    assert [s.uri for s in segments] == [
+        'https://cdn.example.com/vod/video/hd_0.m4s',
+        'https://cdn.example.com/vod/video/hd_1.m4s',
+        'https://cdn.example.com/vod/video/hd_2.m4s',
+    ]
+    assert all(s.duration == 4 for s in segments)
+    assert segments[0].init_section is None
+
+
+def test_parse_mpd_variants():
+    representations = dash.parse_mpd(_mpd('''
+  <AdaptationSet mimeType="video/mp4" codecs="avc1.640028">
+   <SegmentTemplate media="$RepresentationID$_$Number$.m4s" duration="4"/>
+   <Representation id="low" bandwidth="800000" width="640" height="360"/>
+   <Representation id="high" bandwidth="5000000" width="1920" height="1080"/>
+  </AdaptationSet>
+  <AdaptationSet mimeType="audio/mp4">
+   <SegmentTemplate media="$RepresentationID$_$Number$.m4s" duration="4"/>
+   <Representation id="aac" bandwidth="128000" codecs="mp4a.40.2"/>
+  </AdaptationSet>
+  <AdaptationSet mimeType="text/vtt">
+   <Representation id="subs" bandwidth="100"/>
+  </AdaptationSet>'''), MPD_URL)
+    assert [(r['kind'], r['id'], r['resolution'], r['codecs']) for r in representations] == [
+        ('video', 'low', (640, 360), 'avc1.640028'),
+        ('video', 'high', (1920, 1080), 'avc1.640028'),
+        ('audio', 'aac', None, 'mp4a.40.2'),
+    ]
+
+
+@pytest.mark.parametrize('text', [
+    '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="dynamic"><Period/></MPD>',
+    '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011"><Period/><Period/></MPD>',
+    '''<MPD xmlns="urn:mpeg:dash:schema:mpd:2011"><Period><AdaptationSet contentType="video">
+       <ContentProtection schemeIdUri="urn:mpeg:dash:mp4protection:2011"/></AdaptationSet></Period></MPD>''',
+    '<MPD',
+])
+def test_parse_mpd_rejects_unsupported(text):
+    with pytest.raises(dash.UnsupportedManifestError):
+        dash.parse_mpd(text, MPD_URL)
+
+
+def test_single_file_split_into_byte_ranges(monkeypatch):
+    monkeypatch.setattr(dash, 'SEGMENT_BASE_CHUNK', 1000)
+    server = FixtureServer({'/vod/video.mp4': b'\x00' * 2500})
+    base_url = server.start()
+    pool = HttpPool()
+    try:
+        representation = dash.parse_mpd(_mpd('''
+  <AdaptationSet contentType="video">
+   <Representation id="v" bandwidth="1000000" width="1280" height="720">
+    <BaseURL>video.mp4</BaseURL>
+    <SegmentBase indexRange="0-99"/>
+   </Representation>
+  </AdaptationSet>''', 'PT10S'), base_url + '/vod/manifest.mpd')[0]
+        segments, single_file = dash.representation_segments(pool, representation)
+    finally:
+        pool.close()
+        server.stop()
+    assert single_file
+    assert [s.byterange for s in segments] == [(1000, 0), (1000, 1000), (500, 2000)]
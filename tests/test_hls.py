@@ -0,0 +1,120 @@
+import pytest
+
+from fixture_server import FixtureServer, synthetic_hls
+from hls import (Segment, VariantPolicy, download_segments, load_media_playlist, select_time_range,
+                 select_variant)
+from journal import SegmentJournal
+from network import HttpError, HttpPool
+
+SEGMENTS = 8
+SEGMENT_SIZE = 4096
+
+
+@pytest.fixture
+def hls_server():
+    files = synthetic_hls(SEGMENTS, SEGMENT_SIZE)
+    server = FixtureServer(files)
+    base_url = server.start()
+    pool = HttpPool()
+    try:
+        yield server, base_url, pool
+    finally:
+        pool.close()
+        server.stop()
+
+
+def _download(pool, playlist_url, output_file):
+    playlist, media_url = load_media_playlist(pool, playlist_url)
+    journal = SegmentJournal(output_file)
+    try:
+        download_segments(pool, playlist.segments, output_file + '.part.ts', journal, media_url, lambda message: None,
+                          concurrency=2)
+    finally:
+        journal.close()
+
+
+def test_journal_resume_skips_verified_segments(hls_server, tmp_path):
+    server, base_url, pool = hls_server
+    output_file = str(tmp_path / 'vod.mp4')
+    missing = server.files.pop('/hls/seg5.ts')
+
+    with pytest.raises(HttpError):
+        _download(pool, base_url + '/hls/master.m3u8', output_file)
+
+    server.files['/hls/seg5.ts'] = missing
+    server.hits.clear()
+    _download(pool, base_url + '/hls/master.m3u8', output_file)
+
+    with open(output_file + '.part.ts', 'rb') as f:
+        assert f.read() == b''.join(server.files[f'/hls/seg{i}.ts'] for i in range(SEGMENTS))
+    # O diário confirmou os segmentos gravados antes da falha; só os seguintes voltam à rede
+    assert [server.hits[f'/hls/seg{i}.ts'] for i in range(SEGMENTS)] == [0, 0, 0, 0, 0, 1, 1, 1]
+
+
+def test_journal_resume_redownloads_corrupted_segments(hls_server, tmp_path):
+    server, base_url, pool = hls_server
+    output_file = str(tmp_path / 'vod.mp4')
+    _download(pool, base_url + '/hls/media.m3u8', output_file)
+    part_file = output_file + '.part.ts'
+    with open(part_file, 'r+b') as f:
+        f.seek(3 * SEGMENT_SIZE + 10)
+        f.write(b'\xff')
+
+    server.hits.clear()
+    _download(pool, base_url + '/hls/media.m3u8', output_file)
+
+    with open(part_file, 'rb') as f:
+        assert f.read() == b''.join(server.files[f'/hls/seg{i}.ts'] for i in range(SEGMENTS))
+    assert [server.hits[f'/hls/seg{i}.ts'] for i in range(SEGMENTS)] == [0, 0, 0, 1, 1, 1, 1, 1]
+
+
+def _segments(*durations):
+    return [Segment(uri=f'seg{i}.ts', duration=duration, sequence=i) for i, duration in enumerate(durations)]
+
+
+def test_select_time_range_snaps_to_segment_boundaries():
+    segments = _segments(4, 4, 4, 4, 4)
+    selected, offset = select_time_range(segments, 5, 10)
+    assert [s.sequence for s in selected] == [1, 2]
+    assert offset == 4
+
+
+def test_select_time_range_open_ends():
+    segments = _segments(4, 4, 2.5, 4)
+    selected, offset = select_time_range(segments, None, 6)
+    assert [s.sequence for s in selected] == [0, 1]
+    assert offset == 0
+    selected, offset = select_time_range(segments, 9)
+    assert [s.sequence for s in selected] == [2, 3]
+    assert offset == 8
+
+
+def test_select_time_range_boundary_is_exclusive():
+    selected, offset = select_time_range(_segments(4, 4, 4), 4, 8)
+    assert [s.sequence for s in selected] == [1]
+    assert offset == 4
+
+
+def test_select_time_range_outside_video():
+    with pytest.raises(ValueError):
+        select_time_range(_segments(4, 4), 30, 40)
+
+
+def _ladder(*heights):
+    return [{'uri': f'{height}.m3u8', 'bandwidth': height * 5000, 'resolution': (height * 16 // 9, height),
+             'codecs': None} for height in heights]
+
+
+def test_select_variant_caps():
+    ladder = _ladder(540, 864, 1080)
+    assert select_variant(ladder)['resolution'][1] == 1080
+    assert select_variant(ladder, VariantPolicy(max_height=720))['resolution'][1] == 540
+    assert select_variant(ladder, VariantPolicy(max_bandwidth=4500000))['resolution'][1] == 864
+    assert select_variant(ladder, VariantPolicy(max_height=360))['resolution'][1] == 540
+
+
+def test_select_variant_min_height():
+    assert select_variant(_ladder(540, 864, 1080), VariantPolicy(min_height=720))['resolution'][1] == 864
+    assert select_variant(_ladder(360, 720, 1080), VariantPolicy(min_height=720))['resolution'][1] == 720
+    # Nenhuma chega a 720p: fica com a maior
+    assert select_variant(_ladder(360, 480), VariantPolicy(min_height=720))['resolution'][1] == 480
@@ -0,0 +1,31 @@
+import os
+import threading
+
+import jobs
+
+
+def test_same_title_jobs_get_separate_files(tmp_path):
+    store = jobs.JobStore(str(tmp_path / 'jobs.sqlite3'))
+    written = []
+    done = threading.Event()
+
+    def download(video_url, output_file, status_callback):
+        with open(output_file, 'wb') as f:
+            f.write(video_url.encode())
+        written.append(output_file)
+        if len(written) == 2:
+            done.set()
+
+    queue = jobs.JobQueue(store, lambda url, cookie_path, callback: ('Weverse: Live', url + '.m3u8'), download,
+                          lambda message: None, poll_interval=0.05)
+    queue.start()
+    try:
+        first = queue.submit('https://weverse.io/a/live/1-1', output_dir=str(tmp_path))
+        second = queue.submit('https://weverse.io/a/live/1-2', output_dir=str(tmp_path))
+        assert done.wait(10)
+    finally:
+        queue.stop()
+        store.close()
+
+    assert sorted(written) == [str(tmp_path / f'Weverse Live [{first}].mp4'), str(tmp_path / f'Weverse Live [{second}].mp4')]
+    assert all(os.path.getsize(path) for path in written)
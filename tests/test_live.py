@@ -0,0 +1,51 @@
+import pytest
+
+import live
+from fixture_server import FixtureServer, synthetic_live
+
+SEGMENT_SIZE = 1024
+
+
+@pytest.fixture
+def joined_parts(monkeypatch):
+    # Sem ffmpeg: registra o conteúdo de cada parte e une os bytes
+    parts = []
+
+    def concat(part_files, output_file):
+        for part_file in part_files:
+            with open(part_file, 'rb') as f:
+                parts.append(f.read())
+        with open(output_file, 'wb') as f:
+            f.write(b''.join(parts))
+
+    monkeypatch.setattr(live, 'concat', concat)
+    return parts
+
+
+def _record(files, tmp_path):
+    server = FixtureServer(files)
+    base_url = server.start()
+    try:
+        output_file = str(tmp_path / 'live.mp4')
+        live.record_live(base_url + '/live/media.m3u8', output_file, lambda message: None, concurrency=2)
+        with open(output_file, 'rb') as f:
+            return f.read()
+    finally:
+        server.stop()
+
+
+def _segments(files, stream, indexes):
+    return b''.join(files[f'/live/s{stream}_{i}.ts'] for i in indexes)
+
+
+def test_live_rollover_records_every_segment(tmp_path, joined_parts):
+    files = synthetic_live([(100, 10)], SEGMENT_SIZE)
+    assert _record(files, tmp_path) == _segments(files, 0, range(10))
+    assert len(joined_parts) == 1
+
+
+def test_live_restart_reusing_sequence_numbers(tmp_path, joined_parts):
+    # A transmissão recomeça na sequência 4, que já foi gravada com outro segmento
+    files = synthetic_live([(0, 6), (4, 5)], SEGMENT_SIZE)
+    assert _record(files, tmp_path) == _segments(files, 0, range(6)) + _segments(files, 1, range(5))
+    assert joined_parts == [_segments(files, 0, range(6)), _segments(files, 1, range(5))]
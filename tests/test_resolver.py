@@ -0,0 +1,81 @@
+import pytest
+
+import resolver
+from fixture_server import FixtureServer
+from network import HttpPool
+
+PAGE_PATH = '/bts/media/1-123456'
+COOKIES = [
+    {'name': 'we2_access_token', 'value': 'abc', 'domain': '127.0.0.1', 'path': '/'},
+    {'name': 'other_site', 'value': 'x', 'domain': 'example.com', 'path': '/'},
+]
+
+# JSON embutido como o Next.js grava: barras escapadas e entidades HTML
+PAGE = r'''<html><head>
+<title>fallback</title>
+<meta property="og:title" content="Live &amp; Talk">
+<meta property="og:image" content="https://phinf.weverse.io/thumb.jpg">
+</head><body>
+<script id="__NEXT_DATA__" type="application/json">{"post":{"extension":{"video":{
+ "mp4":"https:\/\/weverse-vod.akamai.net\/v\/1-123456\/720.mp4?token=a",
+ "dash":"https://weverse-vod.akamai.net/v/1-123456/manifest.mpd",
+ "hls":"https:\/\/weverse-vod.akamai.net\/v\/1-123456\/master.m3u8?hdnts=exp=1&amp;acl=*"}}}}</script>
+<img src="https://ads.example.com/banner.m3u8">
+</body></html>'''
+
+API_BODY = b'''{"videoInfo":{"files":[
+ {"url":"https:\\/\\/weverse-vod.akamai.net\\/v\\/1-123456\\/1080.mp4"},
+ {"url":"https:\\/\\/weverse-vod.akamai.net\\/v\\/1-123456\\/vod.mpd?t=1"}]}}'''
+
+
+@pytest.fixture
+def stub():
+    server = FixtureServer({})
+    base_url = server.start()
+    pool = HttpPool(cookies=COOKIES)
+    try:
+        yield server, base_url, pool
+    finally:
+        pool.close()
+        server.stop()
+
+
+def test_page_prefers_hls_and_sends_cookies(stub):
+    server, base_url, pool = stub
+    server.files[PAGE_PATH] = PAGE.encode()
+
+    title, video_url, thumbnail = resolver.resolve_page(base_url + PAGE_PATH, COOKIES, pool=pool, api_endpoints=[])
+
+    assert video_url == 'https://weverse-vod.akamai.net/v/1-123456/master.m3u8?hdnts=exp=1&acl=*'
+    assert title == 'Live & Talk'
+    assert thumbnail == 'https://phinf.weverse.io/thumb.jpg'
+    assert server.request_headers[PAGE_PATH]['Cookie'] == 'we2_access_token=abc'
+
+
+def test_dash_preferred_over_mp4():
+    urls = resolver.find_media_urls(PAGE.replace('master.m3u8', 'master.txt'))
+    assert resolver.pick_media_url(urls) == 'https://weverse-vod.akamai.net/v/1-123456/manifest.mpd'
+    mp4_only = [url for url in urls if '.mp4' in url]
+    assert resolver.pick_media_url(mp4_only) == 'https://weverse-vod.akamai.net/v/1-123456/720.mp4?token=a'
+    assert resolver.pick_media_url([]) is None
+
+
+def test_api_endpoint_used_when_page_has_no_manifest(stub):
+    server, base_url, pool = stub
+    server.files[PAGE_PATH] = b'<html><head><title>Weverse</title></head><body>carregando...</body></html>'
+    server.files['/api/post/1-123456/video'] = API_BODY
+    endpoints = [base_url + '/api/missing', base_url + '/api/post/{post_id}/video']
+
+    title, video_url, thumbnail = resolver.resolve_page(base_url + PAGE_PATH, COOKIES, pool=pool,
+                                                        api_endpoints=endpoints)
+
+    assert video_url == 'https://weverse-vod.akamai.net/v/1-123456/vod.mpd?t=1'
+    assert (title, thumbnail) == ('Weverse', None)
+    api_headers = server.request_headers['/api/post/1-123456/video']
+    assert api_headers['Cookie'] == 'we2_access_token=abc'
+    assert api_headers['Referer'] == base_url + PAGE_PATH
+
+
+def test_unreachable_page_returns_no_url(stub):
+    server, base_url, pool = stub
+    assert resolver.resolve_page(base_url + PAGE_PATH, COOKIES, pool=pool, api_endpoints=[]) == ('', None, None)
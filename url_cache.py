@@ -0,0 +1,171 @@
+"""
+Cache persistente de URLs de mídia já resolvidas, indexado pela URL da página.
+
+Guarda a URL do manifesto, o título e a lista de variantes encontrados na resolução,
+para que novas tentativas e reexecuções em lote não precisem abrir o navegador.
+Cada entrada expira de acordo com os parâmetros de validade da URL assinada da CDN
+(quando existem) e, antes de ser reutilizada, a URL passa por uma verificação rápida.
+"""
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from datetime import datetime, timezone
+
+from network import HttpPool
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL = 6 * 3600 # Validade usada quando a URL não informa quando expira
+EXPIRY_MARGIN = 120 # Segundos de folga antes da expiração da assinatura
+
+
+def _first(query, *names):
+    for name in names:
+        for key, values in query.items():
+            if key.lower() == name.lower() and values:
+                return values[0]
+    return None
+
+
+def _cloudfront_policy_expiry(policy):
+    # CloudFront usa base64 com '-', '_' e '~' no lugar de '+', '=' e '/'
+    policy = policy.replace('-', '+').replace('_', '=').replace('~', '/')
+    data = json.loads(base64.b64decode(policy + '=' * (-len(policy) % 4)))
+    return int(data['Statement'][0]['Condition']['DateLessThan']['AWS:EpochTime'])
+
+
+def signed_url_expiry(url):
+    """
+    Returns the epoch second at which a signed CDN URL stops being valid, or None if the URL
+    carries no recognisable expiry (CloudFront Expires/Policy, S3 X-Amz-Date + X-Amz-Expires,
+    Akamai hdnts/hdnea/__token__ exp=, generic exp/expires).
+    """
+    query = parse_qs(urlsplit(url).query)
+    try:
+        value = _first(query, 'Expires', 'expire', 'exp')
+        if value and value.isdigit():
+            return int(value)
+
+        amz_date = _first(query, 'X-Amz-Date')
+        amz_expires = _first(query, 'X-Amz-Expires')
+        if amz_date and amz_expires:
+            signed_at = datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+            return int(signed_at.timestamp()) + int(amz_expires)
+
+        token = _first(query, 'hdnts', 'hdnea', '__token__')
+        if token:
+            for field in token.split('~'):
+                name, _, field_value = field.partition('=')
+                if name == 'exp' and field_value.isdigit():
+                    return int(field_value)
+
+        policy = _first(query, 'Policy')
+        if policy:
+            return _cloudfront_policy_expiry(policy)
+    except (ValueError, KeyError, IndexError, TypeError):
+        pass
+    return None
+
+
+def url_is_alive(url, pool=None):
+    """Cheap reuse check: a HEAD request (or a 1-byte ranged GET when HEAD isn't allowed) must succeed."""
+    own_pool = pool is None
+    pool = pool or HttpPool(timeout=10)
+    try:
+        status, _, _, _ = pool.request('HEAD', url)
+        if status in (403, 405, 501):
+            # Algumas CDNs só assinam GET; tenta o primeiro byte
+            status, _, _, _ = pool.request('GET', url, {'Range': 'bytes=0-0'})
+        return status < 400
+    except OSError:
+        return False
+    finally:
+        if own_pool:
+            pool.close()
+
+
+class MediaUrlCache:
+    """
+    LRU cache of page URL -> {'video_url', 'title', 'thumbnail', 'duration', 'variants', 'expires_at'} persisted as JSON.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, default_ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = OrderedDict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def _save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def get(self, page_url, validate=None):
+        """
+        Returns the cached entry for page_url, or None if missing or expired.
+        If validate(video_url) is given and returns False, the entry is dropped and None is returned.
+        """
+        with self._lock:
+            entry = self._entries.get(page_url)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                del self._entries[page_url]
+                self._save()
+                return None
+        # A verificação de rede é feita fora do lock
+        if validate and not validate(entry['video_url']):
+            self.discard(page_url)
+            return None
+        with self._lock:
+            if page_url in self._entries:
+                self._entries.move_to_end(page_url)
+        return entry
+
+    def put(self, page_url, video_url, title=None, variants=None, thumbnail=None, duration=None):
+        """Stores a resolved URL; its lifetime comes from the signed URL's expiry when present."""
+        now = time.time()
+        expires_at = now + self.default_ttl
+        signed_expiry = signed_url_expiry(video_url)
+        if signed_expiry is not None:
+            expires_at = min(expires_at, signed_expiry - EXPIRY_MARGIN)
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._entries[page_url] = {
+                'video_url': video_url,
+                'title': title,
+                'thumbnail': thumbnail,
+                'duration': duration,
+                'variants': variants,
+                'expires_at': expires_at,
+            }
+            self._entries.move_to_end(page_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def update(self, page_url, **fields):
+        """Adds fields (e.g. duration, variants) to a cached entry; does nothing if the entry is gone."""
+        with self._lock:
+            entry = self._entries.get(page_url)
+            if entry is None:
+                return
+            entry.update(fields)
+            self._save()
+
+    def discard(self, page_url):
+        with self._lock:
+            if self._entries.pop(page_url, None) is not None:
+                self._save()